@@ -0,0 +1,215 @@
+-- ============================================================
+-- BOOTSTRAP: V5 Paramount Roll-up Tables
+-- Project Aquarius | 2026-10-18
+-- Run in Snowsight — one step at a time
+-- ============================================================
+-- The v5 campaign / line item / zip / DMA endpoints (app.py) used
+-- to scan PARAMOUNT_IMPRESSIONS_REPORT_90_DAYS on every request and
+-- COUNT(DISTINCT ...) impressions, store MAIDs and web IPs.
+--
+-- These roll-ups pre-aggregate that log by day and dimension and
+-- keep HyperLogLog sketches instead of raw IDs, so any date range
+-- can be re-combined at query time:
+--   HLL_ESTIMATE(HLL_COMBINE(IMP_HLL))   -- impressions
+--   HLL_ESTIMATE(HLL_COMBINE(STORE_HLL)) -- store visits
+--   HLL_ESTIMATE(HLL_COMBINE(WEB_HLL))   -- web visits
+--
+-- Dynamic tables (not MATERIALIZED VIEWs) because Snowflake MVs
+-- do not support HLL_ACCUMULATE. Snowflake refreshes them
+-- incrementally within TARGET_LAG.
+-- ============================================================
+
+USE ROLE ACCOUNTADMIN;
+USE WAREHOUSE COMPUTE_WH;
+USE DATABASE QUORUMDB;
+
+
+-- ============================================================
+-- STEP 1: Campaign / line item roll-up
+--   Grain: advertiser x day x IO x line item
+--   Feeds: /api/v5/campaign-performance, /api/v5/lineitem-performance,
+--          /api/v5/timeseries, /api/v5/summary
+-- ============================================================
+
+CREATE OR REPLACE DYNAMIC TABLE QUORUMDB.SEGMENT_DATA.PARAMOUNT_V5_LINEITEM_DAILY
+    TARGET_LAG = '1 hour'
+    WAREHOUSE = COMPUTE_WH
+    CLUSTER BY (QUORUM_ADVERTISER_ID, IMP_DATE)
+AS
+SELECT
+    QUORUM_ADVERTISER_ID,
+    IMP_DATE,
+    IO_ID,
+    LINEITEM_ID,
+    MAX(IO_NAME) as IO_NAME,
+    MAX(LINEITEM_NAME) as LINEITEM_NAME,
+    HLL_ACCUMULATE(CACHE_BUSTER) as IMP_HLL,
+    HLL_ACCUMULATE(CASE WHEN IS_STORE_VISIT = 'TRUE' THEN IMP_MAID END) as STORE_HLL,
+    HLL_ACCUMULATE(CASE WHEN IS_SITE_VISIT = 'TRUE' THEN IP END) as WEB_HLL
+FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_IMPRESSIONS_REPORT_90_DAYS
+GROUP BY QUORUM_ADVERTISER_ID, IMP_DATE, IO_ID, LINEITEM_ID;
+
+
+-- ============================================================
+-- STEP 2: Zip roll-up (DMA is resolved from zip at query time)
+--   Grain: advertiser x day x IO x line item x zip
+--   Feeds: /api/v5/zip-performance, /api/v5/dma-performance
+-- ============================================================
+
+CREATE OR REPLACE DYNAMIC TABLE QUORUMDB.SEGMENT_DATA.PARAMOUNT_V5_ZIP_DAILY
+    TARGET_LAG = '1 hour'
+    WAREHOUSE = COMPUTE_WH
+    CLUSTER BY (QUORUM_ADVERTISER_ID, IMP_DATE)
+AS
+SELECT
+    QUORUM_ADVERTISER_ID,
+    IMP_DATE,
+    IO_ID,
+    LINEITEM_ID,
+    ZIP_CODE,
+    HLL_ACCUMULATE(CACHE_BUSTER) as IMP_HLL,
+    HLL_ACCUMULATE(CASE WHEN IS_STORE_VISIT = 'TRUE' THEN IMP_MAID END) as STORE_HLL,
+    HLL_ACCUMULATE(CASE WHEN IS_SITE_VISIT = 'TRUE' THEN IP END) as WEB_HLL
+FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_IMPRESSIONS_REPORT_90_DAYS
+WHERE ZIP_CODE IS NOT NULL AND ZIP_CODE != '' AND ZIP_CODE != 'null' AND ZIP_CODE != 'UNKNOWN'
+GROUP BY QUORUM_ADVERTISER_ID, IMP_DATE, IO_ID, LINEITEM_ID, ZIP_CODE;
+
+
+-- ============================================================
+-- STEP 3: Cluster the Class B weekly stats table
+--   Every Class B endpoint filters
+--     AGENCY_ID = ? AND ADVERTISER_ID = ? AND LOG_DATE BETWEEN ? AND ?
+--   Cluster on exactly those keys so micro-partition pruning can skip
+--   other agencies/advertisers. TO_DATE keeps the date key at day
+--   cardinality. Do NOT add ZIP / DMA / PUBLISHER — they fan out too
+--   wide and inflate reclustering cost.
+-- ============================================================
+
+ALTER TABLE QUORUMDB.SEGMENT_DATA.CAMPAIGN_PERFORMANCE_REPORT_WEEKLY_STATS
+    CLUSTER BY (AGENCY_ID, ADVERTISER_ID, TO_DATE(LOG_DATE));
+
+-- Average depth should drop toward 1-2 once automatic clustering catches up
+SELECT SYSTEM$CLUSTERING_INFORMATION(
+    'QUORUMDB.SEGMENT_DATA.CAMPAIGN_PERFORMANCE_REPORT_WEEKLY_STATS');
+SELECT SYSTEM$CLUSTERING_INFORMATION('QUORUMDB.SEGMENT_DATA.PARAMOUNT_V5_LINEITEM_DAILY');
+SELECT SYSTEM$CLUSTERING_INFORMATION('QUORUMDB.SEGMENT_DATA.PARAMOUNT_V5_ZIP_DAILY');
+
+
+-- ============================================================
+-- STEP 4: Grant roll-ups to OPTIMIZER_READONLY_ROLE
+-- ============================================================
+
+GRANT SELECT ON QUORUMDB.SEGMENT_DATA.PARAMOUNT_V5_LINEITEM_DAILY TO ROLE OPTIMIZER_READONLY_ROLE;
+GRANT SELECT ON QUORUMDB.SEGMENT_DATA.PARAMOUNT_V5_ZIP_DAILY TO ROLE OPTIMIZER_READONLY_ROLE;
+
+
+-- ============================================================
+-- STEP 5: Verify roll-ups against the raw log (expect <2% drift)
+-- ============================================================
+
+SHOW DYNAMIC TABLES LIKE 'PARAMOUNT_V5_%' IN SCHEMA QUORUMDB.SEGMENT_DATA;
+
+SELECT
+    HLL_ESTIMATE(HLL_COMBINE(IMP_HLL)) as ROLLUP_IMPRESSIONS,
+    (SELECT COUNT(DISTINCT CACHE_BUSTER)
+       FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_IMPRESSIONS_REPORT_90_DAYS
+      WHERE IMP_DATE >= CURRENT_DATE - 7) as RAW_IMPRESSIONS
+FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_V5_LINEITEM_DAILY
+WHERE IMP_DATE >= CURRENT_DATE - 7;
+
+
+-- ============================================================
+-- STEP 6: Warehouse auto-suspend for the v5 keep-warm thread
+--   The keep-warm thread in app.py is off by default. With
+--   SNOWFLAKE_KEEP_WARM_SECONDS=240 it reads one roll-up row on
+--   COMPUTE_WH every 240s. That query runs on the warehouse and
+--   resets its idle clock, so with AUTO_SUSPEND = 300 COMPUTE_WH
+--   never suspends while any app process is up, with or without
+--   traffic, and bills continuously. It suspends 300s after the
+--   last process stops. Prefer STEP 8 if always-on is the goal.
+-- ============================================================
+
+ALTER WAREHOUSE COMPUTE_WH SET AUTO_SUSPEND = 300;
+
+
+-- ============================================================
+-- STEP 7: Search optimization on the zip -> DMA mapping
+--   optimize-geo joins ZIP_DMA_MAPPING on ZIP_CODE for the zips of
+--   one advertiser. Equality search optimization lets those point
+--   lookups prune instead of scanning the whole mapping.
+--   (Zip / DMA performance read ZIP_DMA_LOOKUP, STEP 10.)
+-- ============================================================
+
+ALTER TABLE QUORUMDB.SEGMENT_DATA.ZIP_DMA_MAPPING
+    ADD SEARCH OPTIMIZATION ON EQUALITY(ZIP_CODE);
+
+-- Build progress: SEARCH_OPTIMIZATION_PROGRESS should reach 100
+SHOW TABLES LIKE 'ZIP_DMA_MAPPING' IN SCHEMA QUORUMDB.SEGMENT_DATA;
+
+
+-- ============================================================
+-- STEP 8 (optional): Always-on read warehouse for dashboard queries
+--   Set SNOWFLAKE_READ_WAREHOUSE=READ_WH_XS in the app environment
+--   to route every pooled v5 connection here instead of COMPUTE_WH,
+--   and leave SNOWFLAKE_KEEP_WARM_SECONDS at 0 (it never suspends).
+--   SNOWFLAKE_SCAN_WAREHOUSE=COMPUTE_WH keeps the all-advertiser
+--   scans behind /agencies and /advertisers on the larger warehouse.
+--   AUTO_SUSPEND = 0 never suspends: one XSMALL cluster bills
+--   continuously (~1 credit/hour) in exchange for no resume latency.
+-- ============================================================
+
+CREATE WAREHOUSE IF NOT EXISTS READ_WH_XS
+    WAREHOUSE_SIZE = 'XSMALL'
+    AUTO_SUSPEND = 0
+    AUTO_RESUME = TRUE
+    MIN_CLUSTER_COUNT = 1
+    MAX_CLUSTER_COUNT = 2
+    SCALING_POLICY = 'STANDARD'
+    INITIALLY_SUSPENDED = FALSE;
+GRANT USAGE, OPERATE ON WAREHOUSE READ_WH_XS TO ROLE OPTIMIZER_READONLY_ROLE;
+
+
+-- ============================================================
+-- STEP 9: Cluster the raw Paramount log
+--   creative / publisher / lift / optimize / traffic-sources still
+--   read PARAMOUNT_IMPRESSIONS_REPORT_90_DAYS directly, always with
+--     QUORUM_ADVERTISER_ID = ? AND IMP_DATE BETWEEN ? AND ?
+--   Same keys as the roll-ups above. If the daily load recreates the
+--   table, put the CLUSTER BY in that CREATE instead.
+-- ============================================================
+
+ALTER TABLE QUORUMDB.SEGMENT_DATA.PARAMOUNT_IMPRESSIONS_REPORT_90_DAYS
+    CLUSTER BY (QUORUM_ADVERTISER_ID, IMP_DATE);
+
+-- Run before and after: average depth should fall below 5
+SELECT SYSTEM$CLUSTERING_INFORMATION(
+    'QUORUMDB.SEGMENT_DATA.PARAMOUNT_IMPRESSIONS_REPORT_90_DAYS');
+
+
+-- ============================================================
+-- STEP 10: Zip -> DMA name lookup
+--   zip-performance / dma-performance used to aggregate
+--   DBIP_LOOKUP_US (many IP-range rows per zip) down to one DMA
+--   name per zip on every request. This is the same aggregation,
+--   kept as a dynamic table and refreshed daily; app.py joins it
+--   directly. Run before deploying the app.py that reads it.
+-- ============================================================
+
+CREATE OR REPLACE DYNAMIC TABLE QUORUMDB.SEGMENT_DATA.ZIP_DMA_LOOKUP
+    TARGET_LAG = '1 day'
+    WAREHOUSE = COMPUTE_WH
+    CLUSTER BY (ZIPCODE)
+AS
+SELECT ZIPCODE, MAX(DMA_NAME) as DMA_NAME
+FROM QUORUMDB.SEGMENT_DATA.DBIP_LOOKUP_US
+WHERE DMA_NAME IS NOT NULL AND DMA_NAME != ''
+GROUP BY ZIPCODE;
+
+GRANT SELECT ON QUORUMDB.SEGMENT_DATA.ZIP_DMA_LOOKUP TO ROLE OPTIMIZER_READONLY_ROLE;
+
+
+-- ============================================================
+-- DONE. app.py reads the roll-ups for Paramount (1480) in:
+--   campaign-performance, lineitem-performance, timeseries, summary,
+--   zip-performance, dma-performance
+-- ============================================================
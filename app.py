@@ -3,7 +3,8 @@ Quorum Optimizer API v5 - WEB VISIT FIX v3 (Performance + Accuracy)
 ===================================================================
 FIX v3: Uses APPROX_COUNT_DISTINCT on PARAMOUNT_IMPRESSIONS_REPORT_90_DAYS
 for web/store visit counts. Handles 100M rows in seconds with <2% error.
-No pre-aggregated tables needed.
+The per-advertiser Paramount breakdowns read daily HLL roll-ups instead
+(dynamic tables created by BOOTSTRAP_V5_ROLLUPS.sql, TARGET_LAG 1 hour).
 
 Root cause: PARAMOUNT_DASHBOARD_SUMMARY_STATS.SITE_VISITS was inflated
 (counting total site visitors, not CTV-attributed web visits).
@@ -12,34 +13,74 @@ Lean RX: was 13.5% web VR (broken), now ~1.4% (correct, matches drill-down).
 Changed endpoints (APPROX_COUNT_DISTINCT on impression report):
   - /api/v5/agencies (Paramount section) — all-advertiser scan, uses APPROX
   - /api/v5/advertisers (Paramount branch) — all-advertiser scan, uses APPROX
-  - /api/v5/summary (Paramount branch) — single-advertiser, uses exact COUNT
-  - /api/v5/timeseries (Paramount branch) — single-advertiser, uses exact COUNT
+  - /api/v5/creative-performance (Paramount branch) — uses APPROX
+  - /api/v5/publisher-performance (Paramount branch) — uses APPROX, exact=true for COUNT
+  - /api/v5/optimize, /api/v5/optimize-geo (Paramount branch) — uses APPROX, exact=true for COUNT
+
+Roll-up endpoints (Paramount reads daily HLL sketches, see BOOTSTRAP_V5_ROLLUPS.sql):
+  - /api/v5/campaign-performance, /api/v5/lineitem-performance,
+    /api/v5/timeseries, /api/v5/summary — PARAMOUNT_V5_LINEITEM_DAILY
+    (summary?exact=true keeps the exact COUNT over the raw log)
+  - /api/v5/zip-performance, /api/v5/dma-performance
+    — PARAMOUNT_V5_ZIP_DAILY
 
 New endpoints:
   - /api/v5/creative-performance — creative breakdown with bounce rate + avg pages
+  - /api/v5/dashboard — summary + campaigns + timeseries for one advertiser in one call
 
 Unchanged endpoints (already used impression report correctly):
-  - /api/v5/campaign-performance
-  - /api/v5/lineitem-performance
-  - /api/v5/publisher-performance
-  - /api/v5/zip-performance
-  - /api/v5/dma-performance
   - /api/v5/lift-analysis
   - /api/v5/traffic-sources
-  - /api/v5/optimize / optimize-geo
 """
-from flask import Flask, jsonify, request
+from flask import Flask, g, has_request_context, jsonify, request
+from flask.json.provider import DefaultJSONProvider
+from flask_compress import Compress
 from flask_cors import CORS
+import orjson
+from auth import require_admin
 import snowflake.connector
+from snowflake.connector import DictCursor
 import os
 from datetime import datetime, timedelta, date
-import re
 import time
 import threading
+import queue
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, wraps
+import logging
+
+class OrjsonProvider(DefaultJSONProvider):
+    """jsonify() via orjson. Dates, Decimals and UUIDs still go through Flask's
+    default hook and int dict keys (timeseries agency/advertiser maps) are
+    stringified like the stdlib encoder does, so bodies are equivalent JSON but
+    not byte-identical: orjson writes raw UTF-8 instead of \\u escapes and
+    NaN/Infinity as null."""
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # orjson already produces bytes; skip the str round-trip dumps() needs
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self.option)
+        return self._app.response_class(body, mimetype=self.mimetype)
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)
 
+# Under gunicorn, send app.logger (keep-warm / background refresh warnings)
+# through gunicorn's error log so they share its handlers and --log-level
+_gunicorn_logger = logging.getLogger('gunicorn.error')
+if _gunicorn_logger.handlers:
+    app.logger.handlers = _gunicorn_logger.handlers
+    app.logger.setLevel(_gunicorn_logger.level)
+
 # =============================================================================
 # CONFIGURATION
 # =============================================================================
@@ -59,41 +100,255 @@ AGENCY_CONFIG = {
 
 CLASS_B_AGENCIES = [k for k, v in AGENCY_CONFIG.items() if v['class'] == 'B']
 
+# Name/class lookups accept the int IDs Snowflake returns and the str IDs from
+# query args without casting per call
+AGENCY_NAMES = {k: v['name'] for k, v in AGENCY_CONFIG.items()}
+AGENCY_NAMES.update({str(k): v for k, v in list(AGENCY_NAMES.items())})
+AGENCY_CLASSES = {k: v['class'] for k, v in AGENCY_CONFIG.items()}
+AGENCY_CLASSES.update({str(k): v for k, v in list(AGENCY_CLASSES.items())})
+
 # =============================================================================
 # IN-MEMORY CACHE for slow endpoints (traffic-sources scans 310M row table)
 # =============================================================================
 _cache = {}
 _cache_lock = threading.Lock()
 CACHE_TTL = 600  # 10 minutes
+LISTING_CACHE_TTL = 3600  # agency/advertiser lists: not user-scoped, change at most daily
+CACHE_STALE_FACTOR = 2  # cached_response may serve an entry up to 2x its TTL while refreshing
+_refreshing = set()  # response keys with a background refresh in flight
 
 def cache_get(key):
     with _cache_lock:
         entry = _cache.get(key)
-        if entry and time.time() - entry['ts'] < CACHE_TTL:
+        if entry and time.time() - entry['ts'] < entry['ttl']:
             return entry['data']
         elif entry:
             del _cache[key]
     return None
 
-def cache_set(key, data):
+def cache_set(key, data, ttl=CACHE_TTL):
     with _cache_lock:
-        _cache[key] = {'data': data, 'ts': time.time()}
+        now = time.time()
+        _cache[key] = {'data': data, 'ts': now, 'ttl': ttl}
         # Evict old entries if cache gets too large
         if len(_cache) > 200:
-            cutoff = time.time() - CACHE_TTL
-            expired = [k for k, v in _cache.items() if v['ts'] < cutoff]
+            expired = [k for k, v in _cache.items() if now - v['ts'] >= v['ttl'] * CACHE_STALE_FACTOR]
             for k in expired:
                 del _cache[k]
 
+def cache_peek(key):
+    """(data, fresh) for an entry still inside its stale window, else (None, False)."""
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry:
+            age = time.time() - entry['ts']
+            if age < entry['ttl'] * CACHE_STALE_FACTOR:
+                return entry['data'], age < entry['ttl']
+            del _cache[key]
+    return None, False
+
+def cache_clear(prefix=''):
+    """Drop every cached entry whose key starts with prefix; returns the count."""
+    with _cache_lock:
+        keys = [k for k in _cache if k.startswith(prefix)]
+        for k in keys:
+            del _cache[k]
+    return len(keys)
+
+def _store_response(key, resp, ttl):
+    if not isinstance(resp, tuple) and resp.status_code == 200:
+        cache_set(key, resp.get_data(), ttl)
+
+def _refresh_in_background(key, fn, args, kwargs, ttl):
+    """Re-run a view for a stale cache entry on a daemon thread, at most one
+    refresh per key at a time. The request environ is replayed so the view sees
+    the same path and query args."""
+    with _cache_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+    environ = request.environ.copy()
+
+    def refresh():
+        try:
+            with app.request_context(environ):
+                _store_response(key, fn(*args, **kwargs), ttl)
+        except Exception as e:
+            app.logger.warning(f"background refresh of {key} failed: {e}")
+        finally:
+            with _cache_lock:
+                _refreshing.discard(key)
+
+    threading.Thread(target=refresh, daemon=True).start()
+
+def cached_response(fn=None, ttl=CACHE_TTL):
+    """Serve repeat GETs with the same path + query string from _cache.
+    Only 200 responses are stored; ?nocache=1 skips the lookup and refreshes.
+    Past its TTL an entry is still served (up to CACHE_STALE_FACTOR x TTL) while a
+    background thread recomputes it (stale-while-revalidate).
+    X-Cache on the response reports HIT, STALE or MISS.
+    Use bare, or as @cached_response(ttl=...) to keep entries longer."""
+    if fn is None:
+        return lambda f: cached_response(f, ttl=ttl)
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        params = sorted((k, v) for k, v in request.args.items(multi=True) if k != 'nocache')
+        key = f"response:{request.path}:{params}"
+        if request.args.get('nocache') != '1':
+            body, fresh = cache_peek(key)
+            if body is not None:
+                if not fresh:
+                    _refresh_in_background(key, fn, args, kwargs, ttl)
+                return app.response_class(body, mimetype='application/json',
+                                          headers={'X-Cache': 'HIT' if fresh else 'STALE'})
+        resp = fn(*args, **kwargs)
+        _store_response(key, resp, ttl)
+        if not isinstance(resp, tuple):
+            resp.headers['X-Cache'] = 'MISS'
+        return resp
+    return wrapper
+
+BROWSER_CACHE_MAX_AGE = 60  # seconds a browser may reuse a GET without asking
+
+@app.after_request
+def add_http_cache_headers(resp):
+    """ETag + Cache-Control on successful GETs so repeat dashboard polls with
+    If-None-Match get an empty 304 instead of the full body."""
+    if request.method == 'GET' and resp.status_code == 200 and not resp.is_streamed:
+        resp.cache_control.private = True
+        resp.cache_control.max_age = BROWSER_CACHE_MAX_AGE
+        resp.add_etag()
+        resp.make_conditional(request)
+    return resp
+
+# Brotli/gzip for JSON bodies over 1 KB. after_request hooks run in reverse
+# registration order, so registering this after add_http_cache_headers means
+# compression happens first and the ETag is taken over the encoded body: each
+# encoding gets its own validator and If-None-Match matches it unchanged.
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_MIN_SIZE'] = 1024
+Compress(app)
+
 def get_agency_name(agency_id):
-    config = AGENCY_CONFIG.get(int(agency_id))
-    return config['name'] if config else f"Agency {agency_id}"
+    return AGENCY_NAMES.get(agency_id) or f"Agency {agency_id}"
 
 def get_agency_class(agency_id):
-    config = AGENCY_CONFIG.get(int(agency_id))
-    return config['class'] if config else 'B'
+    return AGENCY_CLASSES.get(agency_id, 'B')
+
+def strip_advertiser_prefix(name):
+    """Drop a leading "<alphanumeric code> - " (same as re.sub(r'^[0-9A-Za-z]+ - ', '', name),
+    without the regex: the code can't contain ' - ', so it is whatever precedes the first one)."""
+    head, sep, tail = name.partition(' - ')
+    return tail if sep and head.isascii() and head.isalnum() else name
+
+# =============================================================================
+# SNOWFLAKE CONNECTION POOL — reuse authenticated sessions across requests
+# (connect + TLS + auth is 200-800 ms, longer than most v5 queries)
+# =============================================================================
+POOL_SIZE = int(os.environ.get('SNOWFLAKE_POOL_SIZE', 8))
+POOL_RECYCLE = int(os.environ.get('SNOWFLAKE_POOL_RECYCLE', 1800))  # seconds
+# Connections idle in the pool longer than this get a SELECT 1 before reuse
+POOL_PRE_PING_IDLE = int(os.environ.get('SNOWFLAKE_POOL_PRE_PING_IDLE', 300))  # seconds
+# Dashboard reads can run on a dedicated always-on warehouse (READ_WH_XS in
+# BOOTSTRAP_V5_ROLLUPS.sql) so they never wait on a COMPUTE_WH resume
+SNOWFLAKE_WAREHOUSE = (os.environ.get('SNOWFLAKE_READ_WAREHOUSE')
+                       or os.environ.get('SNOWFLAKE_WAREHOUSE', 'COMPUTE_WH'))
+# All-advertiser scans of the raw Paramount log (/agencies, /advertisers) can
+# be sent to a larger warehouse; per-advertiser widgets stay on the one above
+SNOWFLAKE_SCAN_WAREHOUSE = os.environ.get('SNOWFLAKE_SCAN_WAREHOUSE') or SNOWFLAKE_WAREHOUSE
+_conn_pool = queue.LifoQueue(maxsize=POOL_SIZE)
+
+def _expired(conn):
+    return conn.is_closed() or time.time() - conn.pool_opened_at > POOL_RECYCLE
+
+def _alive(conn):
+    """SELECT 1 on a connection that sat idle past POOL_PRE_PING_IDLE; recently
+    used ones are trusted so the hot path stays a single round trip."""
+    if time.time() - conn.pool_released_at < POOL_PRE_PING_IDLE:
+        return True
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.close()
+        return True
+    except Exception:
+        return False
+
+def _checkout_connection(retries):
+    while True:
+        try:
+            conn = _conn_pool.get_nowait()
+        except queue.Empty:
+            conn = _connect_snowflake(retries)
+            conn.pool_opened_at = time.time()
+            return conn
+        if not _expired(conn) and _alive(conn):
+            return conn
+        try:
+            conn.close()
+        except Exception:
+            pass
 
 def get_snowflake_connection(retries=2):
+    """Check out a pooled connection, opening a new one if the pool is empty.
+    Connections older than POOL_RECYCLE, or idle ones failing _alive(), are
+    closed rather than reused. Inside a request the connection is tracked on g, so one a handler never
+    released (it raised first) is returned by _release_request_connections."""
+    conn = _checkout_connection(retries)
+    if has_request_context():
+        g.setdefault('snowflake_conns', []).append(conn)
+    return conn
+
+def release_snowflake_connection(conn):
+    """Return a connection to the pool (closed instead if the pool is full)."""
+    if has_request_context() and conn in g.get('snowflake_conns', ()):
+        g.snowflake_conns.remove(conn)
+    if _expired(conn):
+        conn.close()
+        return
+    conn.pool_released_at = time.time()
+    try:
+        _conn_pool.put_nowait(conn)
+    except queue.Full:
+        conn.close()
+
+@app.teardown_request
+def _release_request_connections(exc):
+    for conn in g.pop('snowflake_conns', []):
+        release_snowflake_connection(conn)
+
+# Opt-in: keep an auto-suspending warehouse running between dashboard polls so
+# the first request after an idle spell doesn't pay the resume delay. Set
+# SNOWFLAKE_KEEP_WARM_SECONDS below the warehouse's AUTO_SUSPEND (e.g. 240 for
+# 300, see BOOTSTRAP_V5_ROLLUPS.sql STEP 6). The warehouse then never suspends
+# while any worker process is up, traffic or not, and bills continuously. Leave
+# at 0 with SNOWFLAKE_READ_WAREHOUSE=READ_WH_XS, which never suspends anyway.
+KEEP_WARM_SECONDS = int(os.environ.get('SNOWFLAKE_KEEP_WARM_SECONDS', 0))
+# Only a query the warehouse executes resets its idle clock: SELECT 1, metadata
+# answers (COUNT(*), MIN/MAX) and reused results don't. Reading a row does, and
+# RANDOM() keeps the result cache from answering it instead.
+KEEP_WARM_QUERY = "SELECT RANDOM() FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_V5_LINEITEM_DAILY LIMIT 1"
+
+def _keep_warehouse_warm():
+    while True:
+        time.sleep(KEEP_WARM_SECONDS)
+        try:
+            conn = get_snowflake_connection()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(KEEP_WARM_QUERY)
+                cursor.fetchall()
+                cursor.close()
+            finally:
+                release_snowflake_connection(conn)
+        except Exception as e:
+            app.logger.warning(f"keep-warm ping failed: {e}")
+
+if KEEP_WARM_SECONDS > 0:
+    threading.Thread(target=_keep_warehouse_warm, daemon=True).start()
+
+def _connect_snowflake(retries=2):
     last_err = None
     for attempt in range(retries + 1):
         try:
@@ -101,10 +356,23 @@ def get_snowflake_connection(retries=2):
                 user=os.environ.get('SNOWFLAKE_USER'),
                 password=os.environ.get('SNOWFLAKE_PASSWORD'),
                 account=os.environ.get('SNOWFLAKE_ACCOUNT'),
-                warehouse=os.environ.get('SNOWFLAKE_WAREHOUSE', 'COMPUTE_WH'),
+                warehouse=SNOWFLAKE_WAREHOUSE,
                 database=os.environ.get('SNOWFLAKE_DATABASE', 'QUORUMDB'),
                 schema=os.environ.get('SNOWFLAKE_SCHEMA', 'SEGMENT_DATA'),
                 role=os.environ.get('SNOWFLAKE_ROLE', 'OPTIMIZER_READONLY_ROLE'),
+                # Pin result reuse on for every pooled session so a role/account
+                # default can't silently disable it. Arrow results are decoded in
+                # the connector's C extension rather than parsed from JSON.
+                # QUERY_TAG attributes this service's queries in QUERY_HISTORY.
+                session_parameters={'USE_CACHED_RESULT': True,
+                                    'PYTHON_CONNECTOR_QUERY_RESULT_FORMAT': 'ARROW',
+                                    'QUERY_TAG': os.environ.get('SNOWFLAKE_QUERY_TAG', 'quorum_optimizer_v5')},
+                # Larger results arrive as several chunks; fetchall() downloads
+                # them on this many threads
+                client_prefetch_threads=8,
+                # Idle pooled sessions heartbeat instead of expiring
+                client_session_keep_alive=True,
+                client_session_keep_alive_heartbeat_frequency=900,
                 insecure_mode=True
             )
         except Exception as e:
@@ -115,12 +383,100 @@ def get_snowflake_connection(retries=2):
                 continue
             raise
 
+# Open this many pooled sessions at startup, off the import path, so the first
+# dashboard loads after a deploy don't each pay connect + auth
+POOL_PREFILL = min(int(os.environ.get('SNOWFLAKE_POOL_PREFILL', 2)), POOL_SIZE)
+
+def _prefill_pool():
+    for _ in range(POOL_PREFILL):
+        try:
+            conn = _connect_snowflake()
+        except Exception as e:
+            app.logger.warning(f"pool prefill failed: {e}")
+            return
+        conn.pool_opened_at = conn.pool_released_at = time.time()
+        try:
+            _conn_pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+            return
+
+if POOL_PREFILL > 0:
+    threading.Thread(target=_prefill_pool, daemon=True).start()
+
+def run_query(query, params=None, as_dicts=False, warehouse=None):
+    """Run one query on its own pooled connection and return all rows.
+    Lets a handler fan independent queries out over a ThreadPoolExecutor.
+    With warehouse, the session switches to it for this query and back
+    before the connection returns to the pool."""
+    conn = get_snowflake_connection()
+    switch = warehouse and warehouse != SNOWFLAKE_WAREHOUSE
+    try:
+        with (conn.cursor(DictCursor) if as_dicts else conn.cursor()) as cursor:
+            if switch:
+                cursor.execute(f"USE WAREHOUSE {warehouse}")
+            try:
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+            finally:
+                if switch:
+                    try:
+                        cursor.execute(f"USE WAREHOUSE {SNOWFLAKE_WAREHOUSE}")
+                    except Exception:
+                        # Don't pool a session left on the scan warehouse
+                        conn.close()
+    finally:
+        release_snowflake_connection(conn)
+    return rows
+
+def wants_exact():
+    """True when the request passes ?exact=true (e.g. numbers quoted back to a client)."""
+    return request.args.get('exact', '').lower() == 'true'
+
+def distinct_count(expr, exact=None):
+    """APPROX_COUNT_DISTINCT(expr) (HLL, ~2% error), or exact COUNT(DISTINCT expr)
+    when exact, which defaults to wants_exact()."""
+    if wants_exact() if exact is None else exact:
+        return f"COUNT(DISTINCT {expr})"
+    return f"APPROX_COUNT_DISTINCT({expr})"
+
+@lru_cache(maxsize=1)
+def _default_dates(minute):
+    """Trailing 30-day window; recomputed once per minute, not per request."""
+    today = date.today()
+    return today - timedelta(days=30), today
+
+@lru_cache(maxsize=256)
+def _parse_date(value):
+    """strptime is slow and dashboards re-send the same few date strings."""
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
 def get_date_range():
-    end_date = request.args.get('end_date', datetime.now().strftime('%Y-%m-%d'))
-    start_date = request.args.get('start_date',
-        (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d'))
+    """Return (start_date, end_date) as date objects so they bind as SQL DATE."""
+    default_start, default_end = _default_dates(int(time.time() // 60))
+    end_date = request.args.get('end_date')
+    start_date = request.args.get('start_date')
+    end_date = _parse_date(end_date) if end_date else default_end
+    start_date = _parse_date(start_date) if start_date else default_start
     return start_date, end_date
 
+def _widget_params(agency_id, advertiser_id):
+    """Binds for the per-advertiser widget queries, including the optional
+    campaign_id / lineitem_id filters (None when not given)."""
+    start_date, end_date = get_date_range()
+    return {'agency_id': agency_id, 'advertiser_id': advertiser_id,
+            'start_date': start_date, 'end_date': end_date,
+            'campaign_id': request.args.get('campaign_id'),
+            'lineitem_id': request.args.get('lineitem_id')}
+
+def _empty_range_response(start_date, end_date, **payload):
+    """A start_date after end_date (e.g. from a broken date picker) can't match
+    any rows: the endpoint's empty payload, so the handler returns it without
+    running a query. None for a real range."""
+    if start_date > end_date:
+        return jsonify({'success': True, **payload})
+    return None
+
 # =============================================================================
 # HEALTH CHECK
 # =============================================================================
@@ -130,34 +486,53 @@ def health_check():
         'status': 'healthy',
         'version': '5.13-pipeline-health',
         'description': 'Added pipeline health dashboard: cross-client monitoring for impressions, store visits, web pixels',
+        'distinct_counts': 'Paramount visit/impression counts are HyperLogLog estimates (~2% error). '
+                           'exact=true (exact COUNT(DISTINCT), higher query cost) is honoured only by '
+                           'summary, publisher-performance, optimize, optimize-geo and the dashboard '
+                           'summary/publishers widgets. campaign, lineitem, timeseries, zip and dma '
+                           'read HLL roll-ups (up to 1 hour behind) and creative-performance always '
+                           'uses APPROX; those ignore exact.',
         'endpoints': [
             '/api/v5/agencies', '/api/v5/advertisers', '/api/v5/campaigns',
             '/api/v5/lineitems', '/api/v5/creative-performance', '/api/v5/publishers',
             '/api/v5/zip-performance', '/api/v5/dma-performance', '/api/v5/summary',
-            '/api/v5/timeseries', '/api/v5/lift-analysis', '/api/v5/traffic-sources',
+            '/api/v5/timeseries', '/api/v5/dashboard', '/api/v5/lift-analysis', '/api/v5/traffic-sources',
             '/api/v5/optimize', '/api/v5/agency-timeseries', '/api/v5/advertiser-timeseries',
-            '/api/v5/pipeline-health'
+            '/api/v5/pipeline-health', '/api/v5/cache/invalidate'
         ]
     })
 
+@app.route('/api/v5/cache/invalidate', methods=['POST'])
+@require_admin
+def invalidate_cache():
+    """Drop cached responses, e.g. after a data load. ?path=/api/v5/summary
+    limits it to one endpoint; no path clears everything.
+    The cache lives in each worker process, so this only clears the worker
+    that handles the POST (its pid is returned); others expire by TTL."""
+    path = request.args.get('path', '')
+    prefix = f"response:{path}" if path else ''
+    return jsonify({'success': True, 'cleared': cache_clear(prefix), 'pid': os.getpid(),
+                    'scope': 'this worker process only'})
+
 # =============================================================================
 # AGENCY OVERVIEW  [FIXED: Paramount web visits]
 # =============================================================================
 @app.route('/api/v5/agencies', methods=['GET'])
+@cached_response(ttl=LISTING_CACHE_TTL)
 def get_agencies():
     try:
         start_date, end_date = get_date_range()
-        conn = get_snowflake_connection()
-        cursor = conn.cursor()
-
-        all_results = []
+        empty = _empty_range_response(start_date, end_date, data=[])
+        if empty is not None:
+            return empty
+        params = {'start_date': start_date, 'end_date': end_date}
 
         # Class B agencies — unchanged (web visits already hardcoded to 0)
         query_class_b = """
             SELECT
                 AGENCY_ID,
-                SUM(IMPRESSIONS) as IMPRESSIONS,
-                SUM(VISITORS) as STORE_VISITS,
+                ZEROIFNULL(SUM(IMPRESSIONS)) as IMPRESSIONS,
+                ZEROIFNULL(SUM(VISITORS)) as STORE_VISITS,
                 0 as WEB_VISITS,
                 COUNT(DISTINCT ADVERTISER_ID) as ADVERTISER_COUNT
             FROM QUORUMDB.SEGMENT_DATA.CAMPAIGN_PERFORMANCE_REPORT_WEEKLY_STATS
@@ -165,17 +540,6 @@ def get_agencies():
             GROUP BY AGENCY_ID
             HAVING SUM(IMPRESSIONS) > 0 OR SUM(VISITORS) > 0
         """
-        cursor.execute(query_class_b, {'start_date': start_date, 'end_date': end_date})
-        for row in cursor.fetchall():
-            agency_id = row[0]
-            all_results.append({
-                'AGENCY_ID': agency_id,
-                'AGENCY_NAME': get_agency_name(agency_id),
-                'IMPRESSIONS': row[1] or 0,
-                'STORE_VISITS': row[2] or 0,
-                'WEB_VISITS': row[3] or 0,
-                'ADVERTISER_COUNT': row[4] or 0
-            })
 
         # FIXED v4: APPROX_COUNT_DISTINCT(CACHE_BUSTER) for correct impression count
         query_paramount = """
@@ -188,22 +552,24 @@ def get_agencies():
             FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_IMPRESSIONS_REPORT_90_DAYS
             WHERE IMP_DATE BETWEEN %(start_date)s AND %(end_date)s
         """
-        cursor.execute(query_paramount, {'start_date': start_date, 'end_date': end_date})
-        row = cursor.fetchone()
-        if row and (row[1] or row[2] or row[3]):
-            all_results.append({
-                'AGENCY_ID': 1480,
-                'AGENCY_NAME': 'Paramount',
-                'IMPRESSIONS': row[1] or 0,
-                'STORE_VISITS': row[2] or 0,
-                'WEB_VISITS': row[3] or 0,
-                'ADVERTISER_COUNT': row[4] or 0
-            })
 
-        all_results.sort(key=lambda x: x.get('IMPRESSIONS', 0) or 0, reverse=True)
+        # Independent scans of different tables — run them side by side
+        with ThreadPoolExecutor(max_workers=2) as ex:
+            f_class_b = ex.submit(run_query, query_class_b, params, as_dicts=True)
+            f_paramount = ex.submit(run_query, query_paramount, params, as_dicts=True,
+                                    warehouse=SNOWFLAKE_SCAN_WAREHOUSE)
+            all_results, rows_paramount = f_class_b.result(), f_paramount.result()
 
-        cursor.close()
-        conn.close()
+        # Rows arrive as dicts with nulls already zeroed in SQL; only the name is added here
+        for r in all_results:
+            r['AGENCY_NAME'] = get_agency_name(r['AGENCY_ID'])
+
+        row = rows_paramount[0] if rows_paramount else None
+        if row and (row['IMPRESSIONS'] or row['STORE_VISITS'] or row['WEB_VISITS']):
+            row['AGENCY_NAME'] = 'Paramount'
+            all_results.append(row)
+
+        all_results.sort(key=lambda x: x.get('IMPRESSIONS', 0) or 0, reverse=True)
 
         return jsonify({'success': True, 'data': all_results})
 
@@ -214,6 +580,7 @@ def get_agencies():
 # ADVERTISER OVERVIEW  [FIXED: Paramount web visits]
 # =============================================================================
 @app.route('/api/v5/advertisers', methods=['GET'])
+@cached_response(ttl=LISTING_CACHE_TTL)
 def get_advertisers():
     try:
         agency_id = request.args.get('agency_id')
@@ -222,10 +589,15 @@ def get_advertisers():
 
         agency_id = int(agency_id)
         start_date, end_date = get_date_range()
-        conn = get_snowflake_connection()
-        cursor = conn.cursor()
+        empty = _empty_range_response(start_date, end_date, data=[])
+        if empty is not None:
+            return empty
+        params = {'agency_id': agency_id, 'start_date': start_date, 'end_date': end_date}
+        warehouse = None
 
         if agency_id == 1480:
+            # Every Paramount advertiser over the raw log: run on the scan warehouse
+            warehouse = SNOWFLAKE_SCAN_WAREHOUSE
             # FIXED v4: APPROX_COUNT_DISTINCT(CACHE_BUSTER) for correct impression count
             query = """
                 WITH imp AS (
@@ -247,7 +619,9 @@ def get_advertisers():
                 )
                 SELECT
                     i.ADVERTISER_ID,
-                    COALESCE(n.ADVERTISER_NAME, 'Advertiser ' || i.ADVERTISER_ID) as ADVERTISER_NAME,
+                    -- Strip the "<code> - " prefix Paramount puts on advertiser names
+                    REGEXP_REPLACE(COALESCE(n.ADVERTISER_NAME, 'Advertiser ' || i.ADVERTISER_ID),
+                                   '^[0-9A-Za-z]+ - ', '') as ADVERTISER_NAME,
                     i.IMPRESSIONS,
                     i.STORE_VISITS,
                     i.WEB_VISITS
@@ -255,7 +629,6 @@ def get_advertisers():
                 LEFT JOIN names n ON i.ADVERTISER_ID = n.QUORUM_ADVERTISER_ID
                 ORDER BY i.IMPRESSIONS DESC
             """
-            cursor.execute(query, {'start_date': start_date, 'end_date': end_date})
         else:
             query = """
                 SELECT
@@ -273,22 +646,8 @@ def get_advertisers():
                 HAVING SUM(w.IMPRESSIONS) > 0 OR SUM(w.VISITORS) > 0
                 ORDER BY 3 DESC
             """
-            cursor.execute(query, {
-                'agency_id': agency_id,
-                'start_date': start_date,
-                'end_date': end_date
-            })
 
-        columns = [desc[0] for desc in cursor.description]
-        results = [dict(zip(columns, row)) for row in cursor.fetchall()]
-
-        if agency_id == 1480:
-            for r in results:
-                if r.get('ADVERTISER_NAME'):
-                    r['ADVERTISER_NAME'] = re.sub(r'^[0-9A-Za-z]+ - ', '', r['ADVERTISER_NAME'])
-
-        cursor.close()
-        conn.close()
+        results = run_query(query, params, as_dicts=True, warehouse=warehouse)
 
         return jsonify({'success': True, 'data': results})
 
@@ -296,9 +655,45 @@ def get_advertisers():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 # =============================================================================
-# CAMPAIGN PERFORMANCE (unchanged — already used impression report correctly)
+# CAMPAIGN PERFORMANCE  [Paramount: daily HLL roll-up]
 # =============================================================================
+# Daily HLL roll-up (BOOTSTRAP_V5_ROLLUPS.sql) instead of raw 90-day log
+SQL_CAMPAIGN_PARAMOUNT = """
+    SELECT
+        IO_ID,
+        MAX(IO_NAME) as IO_NAME,
+        HLL_ESTIMATE(HLL_COMBINE(IMP_HLL)) as IMPRESSIONS,
+        HLL_ESTIMATE(HLL_COMBINE(STORE_HLL)) as STORE_VISITS,
+        HLL_ESTIMATE(HLL_COMBINE(WEB_HLL)) as WEB_VISITS
+    FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_V5_LINEITEM_DAILY
+    WHERE QUORUM_ADVERTISER_ID = %(advertiser_id)s
+      AND IMP_DATE BETWEEN %(start_date)s AND %(end_date)s
+    GROUP BY IO_ID
+    HAVING IMPRESSIONS >= 100
+    ORDER BY 3 DESC
+"""
+SQL_CAMPAIGN_CLASS_B = """
+    SELECT
+        CAST(IO_ID AS NUMBER) as IO_ID,
+        MAX(IO_NAME) as IO_NAME,
+        SUM(IMPRESSIONS) as IMPRESSIONS,
+        SUM(VISITORS) as STORE_VISITS,
+        0 as WEB_VISITS
+    FROM QUORUMDB.SEGMENT_DATA.CAMPAIGN_PERFORMANCE_REPORT_WEEKLY_STATS
+    WHERE AGENCY_ID = %(agency_id)s
+      AND ADVERTISER_ID = %(advertiser_id)s
+      AND LOG_DATE BETWEEN %(start_date)s AND %(end_date)s
+    GROUP BY IO_ID
+    HAVING SUM(IMPRESSIONS) >= 100 OR SUM(VISITORS) >= 10
+    ORDER BY 3 DESC
+"""
+
+def _campaign_data(agency_id, params):
+    query = SQL_CAMPAIGN_PARAMOUNT if agency_id == 1480 else SQL_CAMPAIGN_CLASS_B
+    return run_query(query, params, as_dicts=True)
+
 @app.route('/api/v5/campaign-performance', methods=['GET'])
+@cached_response
 def get_campaign_performance():
     try:
         agency_id = request.args.get('agency_id')
@@ -309,63 +704,76 @@ def get_campaign_performance():
 
         agency_id = int(agency_id)
         start_date, end_date = get_date_range()
-        conn = get_snowflake_connection()
-        cursor = conn.cursor()
-
-        if agency_id == 1480:
-            query = """
-                SELECT
-                    IO_ID,
-                    MAX(IO_NAME) as IO_NAME,
-                    COUNT(DISTINCT CACHE_BUSTER) as IMPRESSIONS,
-                    COUNT(DISTINCT CASE WHEN IS_STORE_VISIT = 'TRUE' THEN IMP_MAID END) as STORE_VISITS,
-                    COUNT(DISTINCT CASE WHEN IS_SITE_VISIT = 'TRUE' THEN IP END) as WEB_VISITS
-                FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_IMPRESSIONS_REPORT_90_DAYS
-                WHERE QUORUM_ADVERTISER_ID = %(advertiser_id)s
-                  AND IMP_DATE BETWEEN %(start_date)s AND %(end_date)s
-                GROUP BY IO_ID
-                HAVING COUNT(DISTINCT CACHE_BUSTER) >= 100
-                ORDER BY 3 DESC
-            """
-        else:
-            query = """
-                SELECT
-                    CAST(IO_ID AS NUMBER) as IO_ID,
-                    MAX(IO_NAME) as IO_NAME,
-                    SUM(IMPRESSIONS) as IMPRESSIONS,
-                    SUM(VISITORS) as STORE_VISITS,
-                    0 as WEB_VISITS
-                FROM QUORUMDB.SEGMENT_DATA.CAMPAIGN_PERFORMANCE_REPORT_WEEKLY_STATS
-                WHERE AGENCY_ID = %(agency_id)s
-                  AND ADVERTISER_ID = %(advertiser_id)s
-                  AND LOG_DATE BETWEEN %(start_date)s AND %(end_date)s
-                GROUP BY IO_ID
-                HAVING SUM(IMPRESSIONS) >= 100 OR SUM(VISITORS) >= 10
-                ORDER BY 3 DESC
-            """
-
-        cursor.execute(query, {
-            'agency_id': agency_id,
-            'advertiser_id': advertiser_id,
-            'start_date': start_date,
-            'end_date': end_date
-        })
-
-        columns = [desc[0] for desc in cursor.description]
-        results = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        empty = _empty_range_response(start_date, end_date, data=[])
+        if empty is not None:
+            return empty
+        params = {'agency_id': agency_id, 'advertiser_id': advertiser_id, 'start_date': start_date, 'end_date': end_date}
 
-        cursor.close()
-        conn.close()
-
-        return jsonify({'success': True, 'data': results})
+        return jsonify({'success': True, 'data': _campaign_data(agency_id, params)})
 
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 # =============================================================================
-# LINE ITEM PERFORMANCE (unchanged)
+# LINE ITEM PERFORMANCE  [Paramount: daily HLL roll-up]
 # =============================================================================
+# Query text is fixed per filter combination (campaign ID is a bind, not spliced
+# into the SQL) so repeat requests hit Snowflake's result cache
+_SQL_LINEITEM_PARAMOUNT = """
+    SELECT
+        LINEITEM_ID as LI_ID,
+        MAX(LINEITEM_NAME) as LI_NAME,
+        MAX(IO_ID) as IO_ID,
+        MAX(IO_NAME) as IO_NAME,
+        HLL_ESTIMATE(HLL_COMBINE(IMP_HLL)) as IMPRESSIONS,
+        HLL_ESTIMATE(HLL_COMBINE(STORE_HLL)) as STORE_VISITS,
+        HLL_ESTIMATE(HLL_COMBINE(WEB_HLL)) as WEB_VISITS,
+        'Paramount' as PLATFORM
+    FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_V5_LINEITEM_DAILY
+    WHERE QUORUM_ADVERTISER_ID = %(advertiser_id)s
+      AND IMP_DATE BETWEEN %(start_date)s AND %(end_date)s
+      {campaign_filter}
+    GROUP BY LINEITEM_ID
+    HAVING IMPRESSIONS >= 100
+    ORDER BY IMPRESSIONS DESC
+    LIMIT 100
+"""
+_SQL_LINEITEM_CLASS_B = """
+    WITH lineitem_stats AS (
+        SELECT
+            LI_ID, MAX(LI_NAME) as LI_NAME, MAX(IO_ID) as IO_ID, MAX(IO_NAME) as IO_NAME,
+            SUM(IMPRESSIONS) as IMPRESSIONS, SUM(VISITORS) as STORE_VISITS, 0 as WEB_VISITS
+        FROM QUORUMDB.SEGMENT_DATA.CAMPAIGN_PERFORMANCE_REPORT_WEEKLY_STATS
+        WHERE AGENCY_ID = %(agency_id)s AND ADVERTISER_ID = %(advertiser_id)s
+          AND LOG_DATE BETWEEN %(start_date)s AND %(end_date)s {campaign_filter}
+        GROUP BY LI_ID
+        HAVING SUM(IMPRESSIONS) >= 100 OR SUM(VISITORS) >= 10
+    ),
+    lineitem_pt AS (
+        SELECT LINEITEM_ID, PT, COUNT(*) as cnt,
+            ROW_NUMBER() OVER (PARTITION BY LINEITEM_ID ORDER BY COUNT(*) DESC) as rn
+        FROM QUORUMDB.SEGMENT_DATA.XANDR_IMPRESSION_LOG
+        -- Range on the raw TIMESTAMP (not TIMESTAMP::DATE) so partitions prune;
+        -- DATEADD on a bind folds to a constant
+        WHERE AGENCY_ID = %(agency_id)s
+          AND TIMESTAMP >= %(start_date)s AND TIMESTAMP < DATEADD('day', 1, %(end_date)s)
+        GROUP BY LINEITEM_ID, PT
+    )
+    SELECT ls.LI_ID, ls.LI_NAME, ls.IO_ID, ls.IO_NAME, ls.IMPRESSIONS, ls.STORE_VISITS, ls.WEB_VISITS,
+        COALESCE(p.PLATFORM, 'PT=' || COALESCE(lp.PT::VARCHAR, '?')) as PLATFORM
+    FROM lineitem_stats ls
+    LEFT JOIN lineitem_pt lp ON ls.LI_ID = lp.LINEITEM_ID AND lp.rn = 1
+    LEFT JOIN QUORUMDB.SEGMENT_DATA.PT_TO_PLATFORM p ON lp.PT = p.PT
+    ORDER BY ls.IMPRESSIONS DESC LIMIT 100
+"""
+_LINEITEM_CAMPAIGN_FILTER = "AND IO_ID = %(campaign_id)s"
+SQL_LINEITEM_PARAMOUNT_ALL = _SQL_LINEITEM_PARAMOUNT.format(campaign_filter='')
+SQL_LINEITEM_PARAMOUNT_BY_IO = _SQL_LINEITEM_PARAMOUNT.format(campaign_filter=_LINEITEM_CAMPAIGN_FILTER)
+SQL_LINEITEM_CLASS_B_ALL = _SQL_LINEITEM_CLASS_B.format(campaign_filter='')
+SQL_LINEITEM_CLASS_B_BY_IO = _SQL_LINEITEM_CLASS_B.format(campaign_filter=_LINEITEM_CAMPAIGN_FILTER)
+
 @app.route('/api/v5/lineitem-performance', methods=['GET'])
+@cached_response
 def get_lineitem_performance():
     try:
         agency_id = request.args.get('agency_id')
@@ -377,70 +785,21 @@ def get_lineitem_performance():
 
         agency_id = int(agency_id)
         start_date, end_date = get_date_range()
-        conn = get_snowflake_connection()
-        cursor = conn.cursor()
-
-        campaign_filter = ""
-        if campaign_id:
-            campaign_filter = f"AND IO_ID = '{campaign_id}'"
+        empty = _empty_range_response(start_date, end_date, data=[])
+        if empty is not None:
+            return empty
 
         if agency_id == 1480:
-            query = f"""
-                SELECT
-                    LINEITEM_ID as LI_ID,
-                    MAX(LINEITEM_NAME) as LI_NAME,
-                    MAX(IO_ID) as IO_ID,
-                    MAX(IO_NAME) as IO_NAME,
-                    COUNT(DISTINCT CACHE_BUSTER) as IMPRESSIONS,
-                    COUNT(DISTINCT CASE WHEN IS_STORE_VISIT = 'TRUE' THEN IMP_MAID END) as STORE_VISITS,
-                    COUNT(DISTINCT CASE WHEN IS_SITE_VISIT = 'TRUE' THEN IP END) as WEB_VISITS,
-                    'Paramount' as PLATFORM
-                FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_IMPRESSIONS_REPORT_90_DAYS
-                WHERE QUORUM_ADVERTISER_ID = %(advertiser_id)s
-                  AND IMP_DATE BETWEEN %(start_date)s AND %(end_date)s
-                  {campaign_filter}
-                GROUP BY LINEITEM_ID
-                HAVING COUNT(DISTINCT CACHE_BUSTER) >= 100
-                ORDER BY COUNT(DISTINCT CACHE_BUSTER) DESC
-                LIMIT 100
-            """
+            query = SQL_LINEITEM_PARAMOUNT_BY_IO if campaign_id else SQL_LINEITEM_PARAMOUNT_ALL
         else:
-            query = f"""
-                WITH lineitem_stats AS (
-                    SELECT
-                        LI_ID, MAX(LI_NAME) as LI_NAME, MAX(IO_ID) as IO_ID, MAX(IO_NAME) as IO_NAME,
-                        SUM(IMPRESSIONS) as IMPRESSIONS, SUM(VISITORS) as STORE_VISITS, 0 as WEB_VISITS
-                    FROM QUORUMDB.SEGMENT_DATA.CAMPAIGN_PERFORMANCE_REPORT_WEEKLY_STATS
-                    WHERE AGENCY_ID = %(agency_id)s AND ADVERTISER_ID = %(advertiser_id)s
-                      AND LOG_DATE BETWEEN %(start_date)s AND %(end_date)s {campaign_filter}
-                    GROUP BY LI_ID
-                    HAVING SUM(IMPRESSIONS) >= 100 OR SUM(VISITORS) >= 10
-                ),
-                lineitem_pt AS (
-                    SELECT LINEITEM_ID, PT, COUNT(*) as cnt,
-                        ROW_NUMBER() OVER (PARTITION BY LINEITEM_ID ORDER BY COUNT(*) DESC) as rn
-                    FROM QUORUMDB.SEGMENT_DATA.XANDR_IMPRESSION_LOG
-                    WHERE AGENCY_ID = %(agency_id)s AND TIMESTAMP::DATE BETWEEN %(start_date)s AND %(end_date)s
-                    GROUP BY LINEITEM_ID, PT
-                )
-                SELECT ls.LI_ID, ls.LI_NAME, ls.IO_ID, ls.IO_NAME, ls.IMPRESSIONS, ls.STORE_VISITS, ls.WEB_VISITS,
-                    COALESCE(p.PLATFORM, 'PT=' || COALESCE(lp.PT::VARCHAR, '?')) as PLATFORM
-                FROM lineitem_stats ls
-                LEFT JOIN lineitem_pt lp ON ls.LI_ID = lp.LINEITEM_ID AND lp.rn = 1
-                LEFT JOIN QUORUMDB.SEGMENT_DATA.PT_TO_PLATFORM p ON lp.PT = p.PT
-                ORDER BY ls.IMPRESSIONS DESC LIMIT 100
-            """
+            query = SQL_LINEITEM_CLASS_B_BY_IO if campaign_id else SQL_LINEITEM_CLASS_B_ALL
 
-        cursor.execute(query, {
+        results = run_query(query, {
             'agency_id': agency_id, 'advertiser_id': advertiser_id,
+            'campaign_id': campaign_id,
             'start_date': start_date, 'end_date': end_date
-        })
+        }, as_dicts=True)
 
-        columns = [desc[0] for desc in cursor.description]
-        results = [dict(zip(columns, row)) for row in cursor.fetchall()]
-
-        cursor.close()
-        conn.close()
         return jsonify({'success': True, 'data': results})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -448,328 +807,364 @@ def get_lineitem_performance():
 # =============================================================================
 # CREATIVE PERFORMANCE (NEW — between Line Items and Publishers)
 # =============================================================================
+def _creative_data(agency_id, params):
+    campaign_id, lineitem_id = params['campaign_id'], params['lineitem_id']
+    if agency_id == 1480:
+        paramount_filters = ""
+        if campaign_id: paramount_filters += " AND IO_ID = %(campaign_id)s"
+        if lineitem_id: paramount_filters += " AND LINEITEM_ID = %(lineitem_id)s"
+
+        # One filtered read of the raw log feeds both the creative totals and
+        # the per-visitor bounce stats (same pattern as the optimize queries)
+        query = f"""
+            WITH base AS (
+                SELECT CREATIVE_ID, CREATIVE_NAME, CACHE_BUSTER, IS_STORE_VISIT, IMP_MAID,
+                    IS_SITE_VISIT, IP, WEB_IMPRESSION_ID
+                FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_IMPRESSIONS_REPORT_90_DAYS
+                WHERE QUORUM_ADVERTISER_ID = %(advertiser_id)s
+                  AND IMP_DATE BETWEEN %(start_date)s AND %(end_date)s
+                  {paramount_filters}
+            ),
+            creative_base AS (
+                SELECT
+                    CREATIVE_ID,
+                    MAX(CREATIVE_NAME) as CREATIVE_NAME,
+                    APPROX_COUNT_DISTINCT(CACHE_BUSTER) as IMPRESSIONS,
+                    APPROX_COUNT_DISTINCT(CASE WHEN IS_STORE_VISIT = 'TRUE' THEN IMP_MAID END) as STORE_VISITS,
+                    APPROX_COUNT_DISTINCT(CASE WHEN IS_SITE_VISIT = 'TRUE' THEN IP END) as WEB_VISITS
+                FROM base
+                GROUP BY CREATIVE_ID
+                HAVING IMPRESSIONS >= 100
+            ),
+            bounce_data AS (
+                SELECT
+                    CREATIVE_ID,
+                    IMP_MAID,
+                    COUNT(DISTINCT WEB_IMPRESSION_ID) as page_views
+                FROM base
+                WHERE IS_SITE_VISIT = 'TRUE'
+                  AND WEB_IMPRESSION_ID IS NOT NULL AND WEB_IMPRESSION_ID != ''
+                  -- Only creatives that pass the impressions cut get bounce stats
+                  AND CREATIVE_ID IN (SELECT CREATIVE_ID FROM creative_base)
+                GROUP BY CREATIVE_ID, IMP_MAID
+            ),
+            bounce_agg AS (
+                SELECT
+                    CREATIVE_ID,
+                    COUNT(*) as TOTAL_WEB_VISITORS,
+                    COUNT_IF(page_views = 1) as BOUNCED_VISITORS,
+                    ROUND(AVG(page_views), 2) as AVG_PAGES_PER_VISITOR
+                FROM bounce_data
+                GROUP BY CREATIVE_ID
+            )
+            SELECT
+                cb.CREATIVE_ID,
+                cb.CREATIVE_NAME,
+                cb.IMPRESSIONS,
+                cb.STORE_VISITS,
+                cb.WEB_VISITS,
+                COALESCE(ba.BOUNCED_VISITORS, 0) as BOUNCED_VISITORS,
+                COALESCE(ba.AVG_PAGES_PER_VISITOR, 0) as AVG_PAGES_PER_VISITOR,
+                ROUND(COALESCE(ba.BOUNCED_VISITORS, 0) * 100.0 / NULLIF(COALESCE(ba.TOTAL_WEB_VISITORS, 0), 0), 1) as BOUNCE_RATE
+            FROM creative_base cb
+            LEFT JOIN bounce_agg ba ON cb.CREATIVE_ID = ba.CREATIVE_ID
+            ORDER BY cb.IMPRESSIONS DESC
+            LIMIT 100
+        """
+    else:
+        # Class B: creative data from Xandr impression log (impressions only)
+        classb_filters = ""
+        if campaign_id: classb_filters += " AND IO_ID = %(campaign_id)s"
+        if lineitem_id: classb_filters += " AND LINEITEM_ID = %(lineitem_id)s"
+
+        query = f"""
+            SELECT
+                CREATIVE_ID,
+                MAX(CREATIVE_NAME) as CREATIVE_NAME,
+                COUNT(*) as IMPRESSIONS,
+                0 as STORE_VISITS,
+                0 as WEB_VISITS,
+                0 as BOUNCED_VISITORS,
+                0 as AVG_PAGES_PER_VISITOR,
+                NULL as BOUNCE_RATE
+            FROM QUORUMDB.SEGMENT_DATA.XANDR_IMPRESSION_LOG
+            WHERE AGENCY_ID = %(agency_id)s
+              AND TIMESTAMP >= %(start_date)s AND TIMESTAMP < DATEADD('day', 1, %(end_date)s)
+              {classb_filters}
+            GROUP BY CREATIVE_ID
+            HAVING COUNT(*) >= 100
+            ORDER BY IMPRESSIONS DESC
+            LIMIT 100
+        """
+
+    return run_query(query, params, as_dicts=True)
+
 @app.route('/api/v5/creative-performance', methods=['GET'])
+@cached_response
 def get_creative_performance():
     try:
         agency_id = request.args.get('agency_id')
         advertiser_id = request.args.get('advertiser_id')
-        campaign_id = request.args.get('campaign_id')
-        lineitem_id = request.args.get('lineitem_id')
 
         if not agency_id or not advertiser_id:
             return jsonify({'success': False, 'error': 'agency_id and advertiser_id required'}), 400
 
         agency_id = int(agency_id)
-        start_date, end_date = get_date_range()
-        conn = get_snowflake_connection()
-        cursor = conn.cursor()
-
-        if agency_id == 1480:
-            paramount_filters = ""
-            if campaign_id: paramount_filters += f" AND IO_ID = '{campaign_id}'"
-            if lineitem_id: paramount_filters += f" AND LINEITEM_ID = '{lineitem_id}'"
-
-            query = f"""
-                WITH creative_base AS (
-                    SELECT
-                        CREATIVE_ID,
-                        MAX(CREATIVE_NAME) as CREATIVE_NAME,
-                        COUNT(DISTINCT CACHE_BUSTER) as IMPRESSIONS,
-                        COUNT(DISTINCT CASE WHEN IS_STORE_VISIT = 'TRUE' THEN IMP_MAID END) as STORE_VISITS,
-                        COUNT(DISTINCT CASE WHEN IS_SITE_VISIT = 'TRUE' THEN IP END) as WEB_VISITS
-                    FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_IMPRESSIONS_REPORT_90_DAYS
-                    WHERE QUORUM_ADVERTISER_ID = %(advertiser_id)s
-                      AND IMP_DATE BETWEEN %(start_date)s AND %(end_date)s
-                      {paramount_filters}
-                    GROUP BY CREATIVE_ID
-                    HAVING COUNT(DISTINCT CACHE_BUSTER) >= 100
-                ),
-                bounce_data AS (
-                    SELECT
-                        CREATIVE_ID,
-                        IMP_MAID,
-                        COUNT(DISTINCT WEB_IMPRESSION_ID) as page_views
-                    FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_IMPRESSIONS_REPORT_90_DAYS
-                    WHERE QUORUM_ADVERTISER_ID = %(advertiser_id)s
-                      AND IMP_DATE BETWEEN %(start_date)s AND %(end_date)s
-                      AND IS_SITE_VISIT = 'TRUE'
-                      AND WEB_IMPRESSION_ID IS NOT NULL AND WEB_IMPRESSION_ID != ''
-                      {paramount_filters}
-                    GROUP BY CREATIVE_ID, IMP_MAID
-                ),
-                bounce_agg AS (
-                    SELECT
-                        CREATIVE_ID,
-                        COUNT(*) as TOTAL_WEB_VISITORS,
-                        SUM(CASE WHEN page_views = 1 THEN 1 ELSE 0 END) as BOUNCED_VISITORS,
-                        ROUND(AVG(page_views), 2) as AVG_PAGES_PER_VISITOR
-                    FROM bounce_data
-                    GROUP BY CREATIVE_ID
-                )
-                SELECT
-                    cb.CREATIVE_ID,
-                    cb.CREATIVE_NAME,
-                    cb.IMPRESSIONS,
-                    cb.STORE_VISITS,
-                    cb.WEB_VISITS,
-                    COALESCE(ba.BOUNCED_VISITORS, 0) as BOUNCED_VISITORS,
-                    COALESCE(ba.AVG_PAGES_PER_VISITOR, 0) as AVG_PAGES_PER_VISITOR,
-                    ROUND(COALESCE(ba.BOUNCED_VISITORS, 0) * 100.0 / NULLIF(COALESCE(ba.TOTAL_WEB_VISITORS, 0), 0), 1) as BOUNCE_RATE
-                FROM creative_base cb
-                LEFT JOIN bounce_agg ba ON cb.CREATIVE_ID = ba.CREATIVE_ID
-                ORDER BY cb.IMPRESSIONS DESC
-                LIMIT 100
-            """
-        else:
-            # Class B: creative data from Xandr impression log (impressions only)
-            classb_filters = ""
-            if campaign_id: classb_filters += f" AND IO_ID = {campaign_id}"
-            if lineitem_id: classb_filters += f" AND LINEITEM_ID = '{lineitem_id}'"
-
-            query = f"""
-                SELECT
-                    CREATIVE_ID,
-                    MAX(CREATIVE_NAME) as CREATIVE_NAME,
-                    COUNT(*) as IMPRESSIONS,
-                    0 as STORE_VISITS,
-                    0 as WEB_VISITS,
-                    0 as BOUNCED_VISITORS,
-                    0 as AVG_PAGES_PER_VISITOR,
-                    NULL as BOUNCE_RATE
-                FROM QUORUMDB.SEGMENT_DATA.XANDR_IMPRESSION_LOG
-                WHERE AGENCY_ID = %(agency_id)s
-                  AND TIMESTAMP::DATE BETWEEN %(start_date)s AND %(end_date)s
-                  {classb_filters}
-                GROUP BY CREATIVE_ID
-                HAVING COUNT(*) >= 100
-                ORDER BY IMPRESSIONS DESC
-                LIMIT 100
-            """
-
-        cursor.execute(query, {
-            'agency_id': agency_id, 'advertiser_id': advertiser_id,
-            'start_date': start_date, 'end_date': end_date
-        })
-
-        columns = [desc[0] for desc in cursor.description]
-        results = [dict(zip(columns, row)) for row in cursor.fetchall()]
-
-        cursor.close()
-        conn.close()
-        return jsonify({'success': True, 'data': results})
+        params = _widget_params(agency_id, advertiser_id)
+        empty = _empty_range_response(params['start_date'], params['end_date'], data=[])
+        if empty is not None:
+            return empty
+        return jsonify({'success': True, 'data': _creative_data(agency_id, params)})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 # =============================================================================
 # PUBLISHER PERFORMANCE (unchanged)
 # =============================================================================
+def _publisher_data(agency_id, params, exact=False):
+    campaign_id, lineitem_id = params['campaign_id'], params['lineitem_id']
+    paramount_filters = ""
+    if campaign_id: paramount_filters += " AND IO_ID = %(campaign_id)s"
+    if lineitem_id: paramount_filters += " AND LINEITEM_ID = %(lineitem_id)s"
+
+    classb_filters = ""
+    if campaign_id: classb_filters += " AND IO_ID = %(campaign_id)s"
+    if lineitem_id: classb_filters += " AND LI_ID = %(lineitem_id)s"
+
+    if agency_id == 1480:
+        query = f"""
+            SELECT SITE as PUBLISHER, {distinct_count('CACHE_BUSTER', exact)} as IMPRESSIONS,
+                {distinct_count("CASE WHEN IS_STORE_VISIT = 'TRUE' THEN IMP_MAID END", exact)} as STORE_VISITS,
+                {distinct_count("CASE WHEN IS_SITE_VISIT = 'TRUE' THEN IP END", exact)} as WEB_VISITS
+            FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_IMPRESSIONS_REPORT_90_DAYS
+            WHERE QUORUM_ADVERTISER_ID = %(advertiser_id)s
+              AND IMP_DATE BETWEEN %(start_date)s AND %(end_date)s {paramount_filters}
+            GROUP BY SITE HAVING IMPRESSIONS >= 100 ORDER BY IMPRESSIONS DESC LIMIT 50
+        """
+    else:
+        query = f"""
+            SELECT PUBLISHER, SUM(IMPRESSIONS) as IMPRESSIONS,
+                SUM(VISITORS) as STORE_VISITS, 0 as WEB_VISITS
+            FROM QUORUMDB.SEGMENT_DATA.CAMPAIGN_PERFORMANCE_REPORT_WEEKLY_STATS
+            WHERE AGENCY_ID = %(agency_id)s AND ADVERTISER_ID = %(advertiser_id)s
+              AND LOG_DATE BETWEEN %(start_date)s AND %(end_date)s {classb_filters}
+            GROUP BY PUBLISHER HAVING SUM(IMPRESSIONS) >= 100 ORDER BY IMPRESSIONS DESC LIMIT 50
+        """
+
+    return run_query(query, params, as_dicts=True)
+
 @app.route('/api/v5/publisher-performance', methods=['GET'])
+@cached_response
 def get_publisher_performance():
     try:
         agency_id = request.args.get('agency_id')
         advertiser_id = request.args.get('advertiser_id')
-        campaign_id = request.args.get('campaign_id')
-        lineitem_id = request.args.get('lineitem_id')
 
         if not agency_id or not advertiser_id:
             return jsonify({'success': False, 'error': 'agency_id and advertiser_id required'}), 400
 
         agency_id = int(agency_id)
-        start_date, end_date = get_date_range()
-        conn = get_snowflake_connection()
-        cursor = conn.cursor()
-
-        paramount_filters = ""
-        if campaign_id: paramount_filters += f" AND IO_ID = '{campaign_id}'"
-        if lineitem_id: paramount_filters += f" AND LINEITEM_ID = '{lineitem_id}'"
-
-        classb_filters = ""
-        if campaign_id: classb_filters += f" AND IO_ID = '{campaign_id}'"
-        if lineitem_id: classb_filters += f" AND LI_ID = '{lineitem_id}'"
-
-        if agency_id == 1480:
-            query = f"""
-                SELECT SITE as PUBLISHER, COUNT(DISTINCT CACHE_BUSTER) as IMPRESSIONS,
-                    COUNT(DISTINCT CASE WHEN IS_STORE_VISIT = 'TRUE' THEN IMP_MAID END) as STORE_VISITS,
-                    COUNT(DISTINCT CASE WHEN IS_SITE_VISIT = 'TRUE' THEN IP END) as WEB_VISITS
-                FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_IMPRESSIONS_REPORT_90_DAYS
-                WHERE QUORUM_ADVERTISER_ID = %(advertiser_id)s
-                  AND IMP_DATE BETWEEN %(start_date)s AND %(end_date)s {paramount_filters}
-                GROUP BY SITE HAVING COUNT(DISTINCT CACHE_BUSTER) >= 100 ORDER BY 2 DESC LIMIT 50
-            """
-        else:
-            query = f"""
-                SELECT PUBLISHER, SUM(IMPRESSIONS) as IMPRESSIONS,
-                    SUM(VISITORS) as STORE_VISITS, 0 as WEB_VISITS
-                FROM QUORUMDB.SEGMENT_DATA.CAMPAIGN_PERFORMANCE_REPORT_WEEKLY_STATS
-                WHERE AGENCY_ID = %(agency_id)s AND ADVERTISER_ID = %(advertiser_id)s
-                  AND LOG_DATE BETWEEN %(start_date)s AND %(end_date)s {classb_filters}
-                GROUP BY PUBLISHER HAVING SUM(IMPRESSIONS) >= 100 ORDER BY 2 DESC LIMIT 50
-            """
-
-        cursor.execute(query, {
-            'agency_id': agency_id, 'advertiser_id': advertiser_id,
-            'start_date': start_date, 'end_date': end_date
-        })
-
-        columns = [desc[0] for desc in cursor.description]
-        results = [dict(zip(columns, row)) for row in cursor.fetchall()]
-        cursor.close()
-        conn.close()
-        return jsonify({'success': True, 'data': results})
+        params = _widget_params(agency_id, advertiser_id)
+        empty = _empty_range_response(params['start_date'], params['end_date'], data=[])
+        if empty is not None:
+            return empty
+        return jsonify({'success': True, 'data': _publisher_data(agency_id, params, exact=wants_exact())})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 # =============================================================================
-# GEOGRAPHIC / ZIP PERFORMANCE (unchanged)
+# GEOGRAPHIC / ZIP PERFORMANCE  [Paramount: daily HLL roll-up]
 # =============================================================================
+def _zip_data(agency_id, params):
+    campaign_id, lineitem_id = params['campaign_id'], params['lineitem_id']
+    if agency_id == 1480:
+        filters = ""
+        if campaign_id: filters += " AND IO_ID = %(campaign_id)s"
+        if lineitem_id: filters += " AND LINEITEM_ID = %(lineitem_id)s"
+
+        query = f"""
+            WITH zip_top AS (
+                SELECT ZIP_CODE,
+                    HLL_ESTIMATE(HLL_COMBINE(IMP_HLL)) as IMPRESSIONS,
+                    HLL_ESTIMATE(HLL_COMBINE(STORE_HLL)) as STORE_VISITS,
+                    HLL_ESTIMATE(HLL_COMBINE(WEB_HLL)) as WEB_VISITS
+                FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_V5_ZIP_DAILY
+                WHERE QUORUM_ADVERTISER_ID = %(advertiser_id)s
+                  AND IMP_DATE BETWEEN %(start_date)s AND %(end_date)s
+                  {filters}
+                GROUP BY ZIP_CODE HAVING IMPRESSIONS >= 100
+                QUALIFY ROW_NUMBER() OVER (ORDER BY STORE_VISITS DESC, IMPRESSIONS DESC) <= 200
+            )
+            SELECT z.ZIP_CODE, COALESCE(d.DMA_NAME, 'Unknown') as DMA_NAME,
+                z.IMPRESSIONS, z.STORE_VISITS, z.WEB_VISITS
+            FROM zip_top z
+            LEFT JOIN QUORUMDB.SEGMENT_DATA.ZIP_DMA_LOOKUP d ON z.ZIP_CODE = d.ZIPCODE
+            ORDER BY 4 DESC, 3 DESC
+        """
+    else:
+        filters = ""
+        if campaign_id: filters += " AND CAMPAIGN_ID = %(campaign_id)s"
+        if lineitem_id: filters += " AND LINEITEM_ID = %(lineitem_id)s"
+
+        query = f"""
+            WITH zip_top AS (
+                SELECT USER_HOME_POSTAL_CODE as ZIP_CODE,
+                    SUM(IMPRESSIONS) as IMPRESSIONS, SUM(STORE_VISITS) as STORE_VISITS
+                FROM QUORUMDB.SEGMENT_DATA.CAMPAIGN_POSTAL_REPORTING
+                WHERE AGENCY_ID = %(agency_id)s AND ADVERTISER_ID = %(advertiser_id)s
+                  -- NOT IN is NULL (filtered out) for NULL codes too
+                  AND USER_HOME_POSTAL_CODE NOT IN ('', 'null', 'UNKNOWN')
+                  {filters}
+                GROUP BY USER_HOME_POSTAL_CODE
+                HAVING SUM(IMPRESSIONS) >= 100 OR SUM(STORE_VISITS) >= 1
+                QUALIFY ROW_NUMBER() OVER (ORDER BY SUM(STORE_VISITS) DESC, SUM(IMPRESSIONS) DESC) <= 200
+            )
+            SELECT z.ZIP_CODE, COALESCE(d.DMA_NAME, 'Unknown') as DMA_NAME,
+                z.IMPRESSIONS, z.STORE_VISITS, 0 as WEB_VISITS
+            FROM zip_top z
+            LEFT JOIN QUORUMDB.SEGMENT_DATA.ZIP_DMA_LOOKUP d ON z.ZIP_CODE = d.ZIPCODE
+            ORDER BY 4 DESC, 3 DESC
+        """
+    return run_query(query, params, as_dicts=True)
+
 @app.route('/api/v5/zip-performance', methods=['GET'])
+@cached_response
 def get_zip_performance():
     try:
         agency_id = request.args.get('agency_id')
         advertiser_id = request.args.get('advertiser_id')
-        campaign_id = request.args.get('campaign_id')
-        lineitem_id = request.args.get('lineitem_id')
 
         if not agency_id or not advertiser_id:
             return jsonify({'success': False, 'error': 'agency_id and advertiser_id required'}), 400
 
         agency_id = int(agency_id)
-        conn = get_snowflake_connection()
-        cursor = conn.cursor()
-
+        params = _widget_params(agency_id, advertiser_id)
+        # Class B postal reporting has no date column; the range is ignored there
+        note = 'Date filtered (matches date selector)' if agency_id == 1480 else 'Full history (all-time data)'
         if agency_id == 1480:
-            start_date, end_date = get_date_range()
-            filters = ""
-            if campaign_id: filters += f" AND IO_ID = '{campaign_id}'"
-            if lineitem_id: filters += f" AND LINEITEM_ID = '{lineitem_id}'"
-
-            query = f"""
-                WITH zip_dma AS (
-                    SELECT ZIPCODE, MAX(DMA_NAME) as DMA_NAME
-                    FROM QUORUMDB.SEGMENT_DATA.DBIP_LOOKUP_US
-                    WHERE DMA_NAME IS NOT NULL AND DMA_NAME != ''
-                    GROUP BY ZIPCODE
-                )
-                SELECT p.ZIP_CODE, COALESCE(d.DMA_NAME, 'Unknown') as DMA_NAME, COUNT(DISTINCT p.CACHE_BUSTER) as IMPRESSIONS,
-                    COUNT(DISTINCT CASE WHEN p.IS_STORE_VISIT = 'TRUE' THEN p.IMP_MAID END) as STORE_VISITS,
-                    COUNT(DISTINCT CASE WHEN p.IS_SITE_VISIT = 'TRUE' THEN p.IP END) as WEB_VISITS
-                FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_IMPRESSIONS_REPORT_90_DAYS p
-                LEFT JOIN zip_dma d ON p.ZIP_CODE = d.ZIPCODE
-                WHERE p.QUORUM_ADVERTISER_ID = %(advertiser_id)s
-                  AND p.IMP_DATE BETWEEN %(start_date)s AND %(end_date)s
-                  AND p.ZIP_CODE IS NOT NULL AND p.ZIP_CODE != '' AND p.ZIP_CODE != 'null' AND p.ZIP_CODE != 'UNKNOWN'
-                  {filters}
-                GROUP BY p.ZIP_CODE, d.DMA_NAME HAVING COUNT(DISTINCT p.CACHE_BUSTER) >= 100
-                ORDER BY 4 DESC, 3 DESC LIMIT 200
-            """
-            cursor.execute(query, {'advertiser_id': advertiser_id, 'start_date': start_date, 'end_date': end_date})
-            note = 'Date filtered (matches date selector)'
-        else:
-            filters = ""
-            if campaign_id: filters += f" AND CAMPAIGN_ID = {campaign_id}"
-            if lineitem_id: filters += f" AND LINEITEM_ID = '{lineitem_id}'"
-
-            query = f"""
-                WITH zip_dma AS (
-                    SELECT ZIPCODE, MAX(DMA_NAME) as DMA_NAME
-                    FROM QUORUMDB.SEGMENT_DATA.DBIP_LOOKUP_US
-                    WHERE DMA_NAME IS NOT NULL AND DMA_NAME != ''
-                    GROUP BY ZIPCODE
-                )
-                SELECT cp.USER_HOME_POSTAL_CODE as ZIP_CODE, COALESCE(d.DMA_NAME, 'Unknown') as DMA_NAME,
-                    SUM(cp.IMPRESSIONS) as IMPRESSIONS,
-                    SUM(cp.STORE_VISITS) as STORE_VISITS, 0 as WEB_VISITS
-                FROM QUORUMDB.SEGMENT_DATA.CAMPAIGN_POSTAL_REPORTING cp
-                LEFT JOIN zip_dma d ON cp.USER_HOME_POSTAL_CODE = d.ZIPCODE
-                WHERE cp.AGENCY_ID = %(agency_id)s AND cp.ADVERTISER_ID = %(advertiser_id)s
-                  AND cp.USER_HOME_POSTAL_CODE IS NOT NULL AND cp.USER_HOME_POSTAL_CODE != ''
-                  AND cp.USER_HOME_POSTAL_CODE != 'null' AND cp.USER_HOME_POSTAL_CODE != 'UNKNOWN'
-                  {filters}
-                GROUP BY cp.USER_HOME_POSTAL_CODE, d.DMA_NAME
-                HAVING SUM(cp.IMPRESSIONS) >= 100 OR SUM(cp.STORE_VISITS) >= 1
-                ORDER BY 4 DESC, 3 DESC LIMIT 200
-            """
-            cursor.execute(query, {'agency_id': agency_id, 'advertiser_id': advertiser_id})
-            note = 'Full history (all-time data)'
-
-        columns = [desc[0] for desc in cursor.description]
-        results = [dict(zip(columns, row)) for row in cursor.fetchall()]
-        cursor.close()
-        conn.close()
-        return jsonify({'success': True, 'data': results, 'note': note})
+            empty = _empty_range_response(params['start_date'], params['end_date'], data=[], note=note)
+            if empty is not None:
+                return empty
+        return jsonify({'success': True, 'data': _zip_data(agency_id, params), 'note': note})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 # =============================================================================
-# DMA PERFORMANCE (unchanged)
+# DMA PERFORMANCE  [Paramount: daily HLL roll-up]
 # =============================================================================
+def _dma_data(agency_id, params):
+    campaign_id, lineitem_id = params['campaign_id'], params['lineitem_id']
+    if agency_id == 1480:
+        filters = ""
+        if campaign_id: filters += " AND p.IO_ID = %(campaign_id)s"
+        if lineitem_id: filters += " AND p.LINEITEM_ID = %(lineitem_id)s"
+
+        query = f"""
+            SELECT d.DMA_NAME as DMA,
+                HLL_ESTIMATE(HLL_COMBINE(p.IMP_HLL)) as IMPRESSIONS,
+                HLL_ESTIMATE(HLL_COMBINE(p.STORE_HLL)) as STORE_VISITS,
+                HLL_ESTIMATE(HLL_COMBINE(p.WEB_HLL)) as WEB_VISITS
+            FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_V5_ZIP_DAILY p
+            JOIN QUORUMDB.SEGMENT_DATA.ZIP_DMA_LOOKUP d ON p.ZIP_CODE = d.ZIPCODE
+            WHERE p.QUORUM_ADVERTISER_ID = %(advertiser_id)s
+              AND p.IMP_DATE BETWEEN %(start_date)s AND %(end_date)s {filters}
+            GROUP BY d.DMA_NAME HAVING IMPRESSIONS >= 100
+            ORDER BY IMPRESSIONS DESC LIMIT 50
+        """
+    else:
+        filters = ""
+        if campaign_id: filters += " AND IO_ID = %(campaign_id)s"
+        if lineitem_id: filters += " AND LI_ID = %(lineitem_id)s"
+
+        query = f"""
+            SELECT DMA, SUM(IMPRESSIONS) as IMPRESSIONS,
+                SUM(VISITORS) as STORE_VISITS, 0 as WEB_VISITS
+            FROM QUORUMDB.SEGMENT_DATA.CAMPAIGN_PERFORMANCE_REPORT_WEEKLY_STATS
+            WHERE AGENCY_ID = %(agency_id)s AND ADVERTISER_ID = %(advertiser_id)s
+              AND LOG_DATE BETWEEN %(start_date)s AND %(end_date)s
+              AND DMA IS NOT NULL AND DMA != '' {filters}
+            GROUP BY DMA HAVING SUM(IMPRESSIONS) >= 100
+            ORDER BY IMPRESSIONS DESC LIMIT 50
+        """
+    return run_query(query, params, as_dicts=True)
+
 @app.route('/api/v5/dma-performance', methods=['GET'])
+@cached_response
 def get_dma_performance():
     try:
         agency_id = request.args.get('agency_id')
         advertiser_id = request.args.get('advertiser_id')
-        campaign_id = request.args.get('campaign_id')
-        lineitem_id = request.args.get('lineitem_id')
 
         if not agency_id or not advertiser_id:
             return jsonify({'success': False, 'error': 'agency_id and advertiser_id required'}), 400
 
         agency_id = int(agency_id)
-        start_date, end_date = get_date_range()
-        conn = get_snowflake_connection()
-        cursor = conn.cursor()
-
-        if agency_id == 1480:
-            filters = ""
-            if campaign_id: filters += f" AND p.IO_ID = '{campaign_id}'"
-            if lineitem_id: filters += f" AND p.LINEITEM_ID = '{lineitem_id}'"
-
-            query = f"""
-                WITH zip_dma AS (
-                    SELECT ZIPCODE, MAX(DMA_NAME) as DMA_NAME
-                    FROM QUORUMDB.SEGMENT_DATA.DBIP_LOOKUP_US
-                    WHERE DMA_NAME IS NOT NULL AND DMA_NAME != ''
-                    GROUP BY ZIPCODE
-                )
-                SELECT d.DMA_NAME as DMA, COUNT(DISTINCT p.CACHE_BUSTER) as IMPRESSIONS,
-                    COUNT(DISTINCT CASE WHEN p.IS_STORE_VISIT = 'TRUE' THEN p.IMP_MAID END) as STORE_VISITS,
-                    COUNT(DISTINCT CASE WHEN p.IS_SITE_VISIT = 'TRUE' THEN p.IP END) as WEB_VISITS
-                FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_IMPRESSIONS_REPORT_90_DAYS p
-                JOIN zip_dma d ON p.ZIP_CODE = d.ZIPCODE
-                WHERE p.QUORUM_ADVERTISER_ID = %(advertiser_id)s
-                  AND p.IMP_DATE BETWEEN %(start_date)s AND %(end_date)s {filters}
-                GROUP BY d.DMA_NAME HAVING COUNT(DISTINCT p.CACHE_BUSTER) >= 100 ORDER BY 2 DESC LIMIT 50
-            """
-            cursor.execute(query, {'advertiser_id': advertiser_id, 'start_date': start_date, 'end_date': end_date})
-        else:
-            filters = ""
-            if campaign_id: filters += f" AND IO_ID = '{campaign_id}'"
-            if lineitem_id: filters += f" AND LI_ID = '{lineitem_id}'"
-
-            query = f"""
-                SELECT DMA, SUM(IMPRESSIONS) as IMPRESSIONS,
-                    SUM(VISITORS) as STORE_VISITS, 0 as WEB_VISITS
-                FROM QUORUMDB.SEGMENT_DATA.CAMPAIGN_PERFORMANCE_REPORT_WEEKLY_STATS
-                WHERE AGENCY_ID = %(agency_id)s AND ADVERTISER_ID = %(advertiser_id)s
-                  AND LOG_DATE BETWEEN %(start_date)s AND %(end_date)s
-                  AND DMA IS NOT NULL AND DMA != '' {filters}
-                GROUP BY DMA HAVING SUM(IMPRESSIONS) >= 100 ORDER BY 2 DESC LIMIT 50
-            """
-            cursor.execute(query, {'agency_id': agency_id, 'advertiser_id': advertiser_id, 'start_date': start_date, 'end_date': end_date})
-
-        columns = [desc[0] for desc in cursor.description]
-        results = [dict(zip(columns, row)) for row in cursor.fetchall()]
-        cursor.close()
-        conn.close()
-        return jsonify({'success': True, 'data': results})
+        params = _widget_params(agency_id, advertiser_id)
+        empty = _empty_range_response(params['start_date'], params['end_date'], data=[])
+        if empty is not None:
+            return empty
+        return jsonify({'success': True, 'data': _dma_data(agency_id, params)})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 # =============================================================================
-# SUMMARY ENDPOINT  [FIXED: Paramount web visits]
+# SUMMARY ENDPOINT  [Paramount: daily HLL roll-up, exact=true reads raw log]
 # =============================================================================
+SQL_SUMMARY_PARAMOUNT = """
+    SELECT
+        HLL_ESTIMATE(HLL_COMBINE(IMP_HLL)) as IMPRESSIONS,
+        HLL_ESTIMATE(HLL_COMBINE(STORE_HLL)) as STORE_VISITS,
+        HLL_ESTIMATE(HLL_COMBINE(WEB_HLL)) as WEB_VISITS,
+        MIN(IMP_DATE) as MIN_DATE,
+        MAX(IMP_DATE) as MAX_DATE
+    FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_V5_LINEITEM_DAILY
+    WHERE QUORUM_ADVERTISER_ID = %(advertiser_id)s
+      AND IMP_DATE BETWEEN %(start_date)s AND %(end_date)s
+"""
+# FIXED v4: COUNT(DISTINCT CACHE_BUSTER) for correct impression count
+SQL_SUMMARY_PARAMOUNT_EXACT = """
+    SELECT
+        COUNT(DISTINCT CACHE_BUSTER) as IMPRESSIONS,
+        COUNT(DISTINCT CASE WHEN IS_STORE_VISIT = 'TRUE' THEN IMP_MAID END) as STORE_VISITS,
+        COUNT(DISTINCT CASE WHEN IS_SITE_VISIT = 'TRUE' THEN IP END) as WEB_VISITS,
+        MIN(IMP_DATE) as MIN_DATE,
+        MAX(IMP_DATE) as MAX_DATE
+    FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_IMPRESSIONS_REPORT_90_DAYS
+    WHERE QUORUM_ADVERTISER_ID = %(advertiser_id)s
+      AND IMP_DATE BETWEEN %(start_date)s AND %(end_date)s
+"""
+_SQL_SUMMARY_CLASS_B = """
+    SELECT SUM(IMPRESSIONS) as IMPRESSIONS, SUM(VISITORS) as STORE_VISITS,
+        0 as WEB_VISITS, MIN(LOG_DATE) as MIN_DATE, MAX(LOG_DATE) as MAX_DATE,
+        {campaign_count} as CAMPAIGN_COUNT, {lineitem_count} as LINEITEM_COUNT
+    FROM QUORUMDB.SEGMENT_DATA.CAMPAIGN_PERFORMANCE_REPORT_WEEKLY_STATS
+    WHERE AGENCY_ID = %(agency_id)s AND ADVERTISER_ID = %(advertiser_id)s
+      AND LOG_DATE BETWEEN %(start_date)s AND %(end_date)s
+"""
+SQL_SUMMARY_CLASS_B = _SQL_SUMMARY_CLASS_B.format(
+    campaign_count='APPROX_COUNT_DISTINCT(IO_ID)', lineitem_count='APPROX_COUNT_DISTINCT(LI_ID)')
+SQL_SUMMARY_CLASS_B_EXACT = _SQL_SUMMARY_CLASS_B.format(
+    campaign_count='COUNT(DISTINCT IO_ID)', lineitem_count='COUNT(DISTINCT LI_ID)')
+
+def _add_visit_rates(result):
+    imps = result.get('IMPRESSIONS') or 0
+    store = result.get('STORE_VISITS') or 0
+    web = result.get('WEB_VISITS') or 0
+    result['STORE_VISIT_RATE'] = round(store * 100.0 / imps, 4) if imps > 0 else 0
+    result['WEB_VISIT_RATE'] = round(web * 100.0 / imps, 4) if imps > 0 else 0
+    result['TOTAL_VISITS'] = store + web
+    return result
+
+def _summary_data(agency_id, params, exact=False):
+    if agency_id == 1480:
+        query = SQL_SUMMARY_PARAMOUNT_EXACT if exact else SQL_SUMMARY_PARAMOUNT
+    else:
+        query = SQL_SUMMARY_CLASS_B_EXACT if exact else SQL_SUMMARY_CLASS_B
+    rows = run_query(query, params, as_dicts=True)
+    return _add_visit_rates(rows[0] if rows else {})
+
 @app.route('/api/v5/summary', methods=['GET'])
+@cached_response
 def get_summary():
     try:
         agency_id = request.args.get('agency_id')
@@ -780,54 +1175,51 @@ def get_summary():
 
         agency_id = int(agency_id)
         start_date, end_date = get_date_range()
-        conn = get_snowflake_connection()
-        cursor = conn.cursor()
-
-        if agency_id == 1480:
-            # FIXED v4: COUNT(DISTINCT CACHE_BUSTER) for correct impression count
-            query = """
-                SELECT
-                    COUNT(DISTINCT CACHE_BUSTER) as IMPRESSIONS,
-                    COUNT(DISTINCT CASE WHEN IS_STORE_VISIT = 'TRUE' THEN IMP_MAID END) as STORE_VISITS,
-                    COUNT(DISTINCT CASE WHEN IS_SITE_VISIT = 'TRUE' THEN IP END) as WEB_VISITS,
-                    MIN(IMP_DATE) as MIN_DATE,
-                    MAX(IMP_DATE) as MAX_DATE
-                FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_IMPRESSIONS_REPORT_90_DAYS
-                WHERE QUORUM_ADVERTISER_ID = %(advertiser_id)s
-                  AND IMP_DATE BETWEEN %(start_date)s AND %(end_date)s
-            """
-        else:
-            query = """
-                SELECT SUM(IMPRESSIONS) as IMPRESSIONS, SUM(VISITORS) as STORE_VISITS,
-                    0 as WEB_VISITS, MIN(LOG_DATE) as MIN_DATE, MAX(LOG_DATE) as MAX_DATE,
-                    COUNT(DISTINCT IO_ID) as CAMPAIGN_COUNT, COUNT(DISTINCT LI_ID) as LINEITEM_COUNT
-                FROM QUORUMDB.SEGMENT_DATA.CAMPAIGN_PERFORMANCE_REPORT_WEEKLY_STATS
-                WHERE AGENCY_ID = %(agency_id)s AND ADVERTISER_ID = %(advertiser_id)s
-                  AND LOG_DATE BETWEEN %(start_date)s AND %(end_date)s
-            """
+        empty = _empty_range_response(start_date, end_date, data=_add_visit_rates({}))
+        if empty is not None:
+            return empty
+        params = {'agency_id': agency_id, 'advertiser_id': advertiser_id, 'start_date': start_date, 'end_date': end_date}
 
-        cursor.execute(query, {'agency_id': agency_id, 'advertiser_id': advertiser_id, 'start_date': start_date, 'end_date': end_date})
-        columns = [desc[0] for desc in cursor.description]
-        row = cursor.fetchone()
-        result = dict(zip(columns, row)) if row else {}
-
-        imps = result.get('IMPRESSIONS') or 0
-        store = result.get('STORE_VISITS') or 0
-        web = result.get('WEB_VISITS') or 0
-        result['STORE_VISIT_RATE'] = round(store * 100.0 / imps, 4) if imps > 0 else 0
-        result['WEB_VISIT_RATE'] = round(web * 100.0 / imps, 4) if imps > 0 else 0
-        result['TOTAL_VISITS'] = store + web
-
-        cursor.close()
-        conn.close()
-        return jsonify({'success': True, 'data': result})
+        return jsonify({'success': True, 'data': _summary_data(agency_id, params, exact=wants_exact())})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 # =============================================================================
-# TIMESERIES ENDPOINT  [FIXED: Paramount web visits]
+# TIMESERIES ENDPOINT  [Paramount: daily HLL roll-up]
 # =============================================================================
+# Daily HLL roll-up: one sketch combine per day instead of a raw-log scan.
+# IMP_DATE is a DATE, so Snowflake renders the ISO string for the whole column
+SQL_TIMESERIES_PARAMOUNT = """
+    SELECT
+        TO_CHAR(IMP_DATE, 'YYYY-MM-DD') as LOG_DATE,
+        HLL_ESTIMATE(HLL_COMBINE(IMP_HLL)) as IMPRESSIONS,
+        HLL_ESTIMATE(HLL_COMBINE(STORE_HLL)) as STORE_VISITS,
+        HLL_ESTIMATE(HLL_COMBINE(WEB_HLL)) as WEB_VISITS
+    FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_V5_LINEITEM_DAILY
+    WHERE QUORUM_ADVERTISER_ID = %(advertiser_id)s
+      AND IMP_DATE BETWEEN %(start_date)s AND %(end_date)s
+    GROUP BY IMP_DATE
+    ORDER BY IMP_DATE
+"""
+SQL_TIMESERIES_CLASS_B = """
+    SELECT LOG_DATE, SUM(IMPRESSIONS) as IMPRESSIONS, SUM(VISITORS) as STORE_VISITS, 0 as WEB_VISITS
+    FROM QUORUMDB.SEGMENT_DATA.CAMPAIGN_PERFORMANCE_REPORT_WEEKLY_STATS
+    WHERE AGENCY_ID = %(agency_id)s AND ADVERTISER_ID = %(advertiser_id)s
+      AND LOG_DATE BETWEEN %(start_date)s AND %(end_date)s
+    GROUP BY LOG_DATE ORDER BY LOG_DATE
+"""
+
+def _timeseries_data(agency_id, params):
+    if agency_id == 1480:
+        return run_query(SQL_TIMESERIES_PARAMOUNT, params, as_dicts=True)
+    # Weekly-stats LOG_DATE keeps Python's str() rendering
+    results = run_query(SQL_TIMESERIES_CLASS_B, params, as_dicts=True)
+    for d in results:
+        if d.get('LOG_DATE'): d['LOG_DATE'] = str(d['LOG_DATE'])
+    return results
+
 @app.route('/api/v5/timeseries', methods=['GET'])
+@cached_response
 def get_timeseries():
     try:
         agency_id = request.args.get('agency_id')
@@ -838,50 +1230,154 @@ def get_timeseries():
 
         agency_id = int(agency_id)
         start_date, end_date = get_date_range()
-        conn = get_snowflake_connection()
-        cursor = conn.cursor()
+        empty = _empty_range_response(start_date, end_date, data=[])
+        if empty is not None:
+            return empty
+        params = {'agency_id': agency_id, 'advertiser_id': advertiser_id, 'start_date': start_date, 'end_date': end_date}
 
-        if agency_id == 1480:
-            # FIXED v4: COUNT(DISTINCT CACHE_BUSTER) for correct impression count
-            query = """
-                SELECT
-                    IMP_DATE as LOG_DATE,
-                    COUNT(DISTINCT CACHE_BUSTER) as IMPRESSIONS,
-                    COUNT(DISTINCT CASE WHEN IS_STORE_VISIT = 'TRUE' THEN IMP_MAID END) as STORE_VISITS,
-                    COUNT(DISTINCT CASE WHEN IS_SITE_VISIT = 'TRUE' THEN IP END) as WEB_VISITS
-                FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_IMPRESSIONS_REPORT_90_DAYS
-                WHERE QUORUM_ADVERTISER_ID = %(advertiser_id)s
-                  AND IMP_DATE BETWEEN %(start_date)s AND %(end_date)s
-                GROUP BY IMP_DATE
-                ORDER BY IMP_DATE
-            """
+        return jsonify({'success': True, 'data': _timeseries_data(agency_id, params)})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+# =============================================================================
+# ADVERTISER DASHBOARD  (summary + campaigns + timeseries in one request)
+# =============================================================================
+DASHBOARD_WIDGETS = {
+    'summary': _summary_data,
+    'campaigns': _campaign_data,
+    'timeseries': _timeseries_data,
+    'creatives': _creative_data,
+    'publishers': _publisher_data,
+    'zips': _zip_data,
+    'dmas': _dma_data,
+}
+DEFAULT_DASHBOARD_WIDGETS = ('summary', 'campaigns', 'timeseries')
+# Widgets whose queries honour ?exact=true, as on their own endpoints
+EXACT_DASHBOARD_WIDGETS = ('summary', 'publishers')
+
+# Class B widgets all aggregate the same weekly-stats slice, so read it once:
+# GROUPING SETS yields the grand total, one row per IO and one per day
+_SQL_DASHBOARD_CLASS_B = """
+    WITH base AS (
+        SELECT CAST(IO_ID AS NUMBER) as IO_ID, IO_NAME, LI_ID, LOG_DATE, IMPRESSIONS, VISITORS
+        FROM QUORUMDB.SEGMENT_DATA.CAMPAIGN_PERFORMANCE_REPORT_WEEKLY_STATS
+        WHERE AGENCY_ID = %(agency_id)s AND ADVERTISER_ID = %(advertiser_id)s
+          AND LOG_DATE BETWEEN %(start_date)s AND %(end_date)s
+    )
+    SELECT
+        CASE WHEN GROUPING(IO_ID) = 0 THEN 'campaigns'
+             WHEN GROUPING(LOG_DATE) = 0 THEN 'timeseries'
+             ELSE 'summary' END as WIDGET,
+        IO_ID, MAX(IO_NAME) as IO_NAME, LOG_DATE,
+        SUM(IMPRESSIONS) as IMPRESSIONS, SUM(VISITORS) as STORE_VISITS, 0 as WEB_VISITS,
+        MIN(LOG_DATE) as MIN_DATE, MAX(LOG_DATE) as MAX_DATE,
+        {campaign_count} as CAMPAIGN_COUNT, {lineitem_count} as LINEITEM_COUNT
+    FROM base
+    GROUP BY GROUPING SETS ((), (IO_ID), (LOG_DATE))
+"""
+SQL_DASHBOARD_CLASS_B = _SQL_DASHBOARD_CLASS_B.format(
+    campaign_count='APPROX_COUNT_DISTINCT(IO_ID)', lineitem_count='APPROX_COUNT_DISTINCT(LI_ID)')
+SQL_DASHBOARD_CLASS_B_EXACT = _SQL_DASHBOARD_CLASS_B.format(
+    campaign_count='COUNT(DISTINCT IO_ID)', lineitem_count='COUNT(DISTINCT LI_ID)')
+_DASHBOARD_CLASS_B_COLUMNS = {
+    'summary': ('IMPRESSIONS', 'STORE_VISITS', 'WEB_VISITS', 'MIN_DATE', 'MAX_DATE',
+                'CAMPAIGN_COUNT', 'LINEITEM_COUNT'),
+    'campaigns': ('IO_ID', 'IO_NAME', 'IMPRESSIONS', 'STORE_VISITS', 'WEB_VISITS'),
+    'timeseries': ('LOG_DATE', 'IMPRESSIONS', 'STORE_VISITS', 'WEB_VISITS'),
+}
+
+def _dashboard_class_b(params, exact=False):
+    """Same payload as the three Class B widget queries, from one scan."""
+    data = {'summary': {}, 'campaigns': [], 'timeseries': []}
+    query = SQL_DASHBOARD_CLASS_B_EXACT if exact else SQL_DASHBOARD_CLASS_B
+    for r in run_query(query, params, as_dicts=True):
+        widget = r['WIDGET']
+        row = {k: r[k] for k in _DASHBOARD_CLASS_B_COLUMNS[widget]}
+        if widget == 'summary':
+            data['summary'] = row
+        elif widget == 'campaigns':
+            # Same cut as SQL_CAMPAIGN_CLASS_B's HAVING clause
+            if (row['IMPRESSIONS'] or 0) >= 100 or (row['STORE_VISITS'] or 0) >= 10:
+                data['campaigns'].append(row)
         else:
-            query = """
-                SELECT LOG_DATE, SUM(IMPRESSIONS) as IMPRESSIONS, SUM(VISITORS) as STORE_VISITS, 0 as WEB_VISITS
-                FROM QUORUMDB.SEGMENT_DATA.CAMPAIGN_PERFORMANCE_REPORT_WEEKLY_STATS
-                WHERE AGENCY_ID = %(agency_id)s AND ADVERTISER_ID = %(advertiser_id)s
-                  AND LOG_DATE BETWEEN %(start_date)s AND %(end_date)s
-                GROUP BY LOG_DATE ORDER BY LOG_DATE
-            """
+            data['timeseries'].append(row)
+
+    _add_visit_rates(data['summary'])
+    data['campaigns'].sort(key=lambda x: x['IMPRESSIONS'] or 0, reverse=True)
+    data['timeseries'].sort(key=lambda x: x['LOG_DATE'])
+    for d in data['timeseries']:
+        d['LOG_DATE'] = str(d['LOG_DATE'])
+    return data
+
+@app.route('/api/v5/dashboard', methods=['GET'])
+@cached_response
+def get_dashboard():
+    """Several widgets for one advertiser in one call, their queries run side by
+    side. ?widgets=summary,zips,... picks them (default: summary, campaigns,
+    timeseries); campaign_id / lineitem_id filter the breakdown widgets and
+    exact=true applies as it does on /summary and /publisher-performance."""
+    try:
+        agency_id = request.args.get('agency_id')
+        advertiser_id = request.args.get('advertiser_id')
 
-        cursor.execute(query, {'agency_id': agency_id, 'advertiser_id': advertiser_id, 'start_date': start_date, 'end_date': end_date})
-        columns = [desc[0] for desc in cursor.description]
-        results = []
-        for row in cursor.fetchall():
-            d = dict(zip(columns, row))
-            if d.get('LOG_DATE'): d['LOG_DATE'] = str(d['LOG_DATE'])
-            results.append(d)
+        if not agency_id or not advertiser_id:
+            return jsonify({'success': False, 'error': 'agency_id and advertiser_id required'}), 400
 
-        cursor.close()
-        conn.close()
-        return jsonify({'success': True, 'data': results})
+        widgets = [w for w in request.args.get('widgets', '').split(',') if w] or DEFAULT_DASHBOARD_WIDGETS
+        unknown = [w for w in widgets if w not in DASHBOARD_WIDGETS]
+        if unknown:
+            return jsonify({'success': False, 'error': f"unknown widgets: {', '.join(unknown)}"}), 400
+
+        agency_id = int(agency_id)
+        params = _widget_params(agency_id, advertiser_id)
+        exact = wants_exact()
+        data = {}
+
+        if params['start_date'] > params['end_date']:
+            # Inverted range: each widget's empty payload, without a query. Class B
+            # zips ignore the range (see get_zip_performance), so they still run.
+            data = {name: _add_visit_rates({}) if name == 'summary' else [] for name in widgets}
+            widgets = [w for w in widgets if w == 'zips' and agency_id != 1480]
+            if not widgets:
+                return jsonify({'success': True, 'data': data})
+
+        # Each query runs on its own pooled connection. Class B summary, campaigns
+        # and timeseries come from one GROUPING SETS scan (_dashboard_class_b).
+        shared = [] if agency_id == 1480 else [w for w in widgets if w in _DASHBOARD_CLASS_B_COLUMNS]
+        with ThreadPoolExecutor(max_workers=len(widgets)) as ex:
+            f_shared = ex.submit(_dashboard_class_b, params, exact) if shared else None
+            futures = {name: ex.submit(DASHBOARD_WIDGETS[name], agency_id, params,
+                                       **({'exact': exact} if name in EXACT_DASHBOARD_WIDGETS else {}))
+                       for name in widgets if name not in shared}
+            data.update({name: f.result() for name, f in futures.items()})
+            if f_shared:
+                class_b = f_shared.result()
+                data.update({name: class_b[name] for name in shared})
+
+        return jsonify({'success': True, 'data': data})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 # =============================================================================
 # LIFT ANALYSIS (unchanged — already used impression report)
 # =============================================================================
+# Two-sided |z| cut-offs for 90/95/99% confidence
+_Z_THRESHOLDS = (1.645, 1.96, 2.576)
+_Z_LABELS = ('NS', '90%', '95%', '99%')
+
+def confidence_from_z(z):
+    if z is None: return None
+    return _Z_LABELS[bisect_right(_Z_THRESHOLDS, abs(float(z)))]
+
+_EMPTY_LIFT_PARAMOUNT = {
+    'web_data': [], 'store_data': [],
+    'web_adv_baseline': None, 'web_network_baseline': None, 'store_network_baseline': None,
+    'web_control_n': 0, 'store_control_n': 0,
+    'total_web_visitors': 0, 'total_store_visitors': 0,
+}
+
 @app.route('/api/v5/lift-analysis', methods=['GET'])
+@cached_response
 def get_lift_analysis():
     try:
         agency_id = request.args.get('agency_id')
@@ -893,8 +1389,14 @@ def get_lift_analysis():
 
         agency_id = int(agency_id)
         start_date, end_date = get_date_range()
+        if agency_id == 1480:
+            empty = _empty_range_response(start_date, end_date, **_EMPTY_LIFT_PARAMOUNT)
+        else:
+            empty = _empty_range_response(start_date, end_date, data=[], baseline=None, visit_type='store')
+        if empty is not None:
+            return empty
         conn = get_snowflake_connection()
-        cursor = conn.cursor()
+        cursor = conn.cursor(DictCursor)
 
         if agency_id == 1480:
             if group_by == 'lineitem':
@@ -913,18 +1415,20 @@ def get_lift_analysis():
 
             query = f"""
                 WITH
-                exposed_devices AS (
-                    SELECT DISTINCT LOWER(REPLACE(IMP_MAID,'-','')) AS device_id
+                -- One pass over the network: a device is exposed if any of its rows
+                -- belong to this advertiser, control if all of them belong to others
+                devices AS (
+                    SELECT LOWER(REPLACE(IMP_MAID,'-','')) AS device_id,
+                        BOOLOR_AGG(QUORUM_ADVERTISER_ID::INT = %(advertiser_id)s) AS is_exposed
                     FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_IMPRESSIONS_REPORT_90_DAYS
-                    WHERE QUORUM_ADVERTISER_ID::INT = %(advertiser_id)s
-                      AND IMP_DATE BETWEEN %(start_date)s AND %(end_date)s AND IMP_MAID IS NOT NULL
+                    WHERE IMP_DATE BETWEEN %(start_date)s AND %(end_date)s AND IMP_MAID IS NOT NULL
+                    GROUP BY 1
+                ),
+                exposed_devices AS (
+                    SELECT device_id FROM devices WHERE is_exposed
                 ),
                 control_devices AS (
-                    SELECT DISTINCT LOWER(REPLACE(IMP_MAID,'-','')) AS device_id
-                    FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_IMPRESSIONS_REPORT_90_DAYS
-                    WHERE QUORUM_ADVERTISER_ID::INT != %(advertiser_id)s
-                      AND IMP_DATE BETWEEN %(start_date)s AND %(end_date)s AND IMP_MAID IS NOT NULL
-                      AND LOWER(REPLACE(IMP_MAID,'-','')) NOT IN (SELECT device_id FROM exposed_devices)
+                    SELECT device_id FROM devices WHERE NOT is_exposed
                 ),
                 adv_web_visit_days AS (
                     SELECT LOWER(REPLACE(MAID,'-','')) AS device_id, DATE(SITE_VISIT_TIMESTAMP) AS event_date
@@ -938,23 +1442,24 @@ def get_lift_analysis():
                     WHERE ADVERTISER_ID = %(advertiser_id)s AND MAID IS NOT NULL
                     GROUP BY 1, 2
                 ),
+                -- devices has one row per device_id and the joins below are against
+                -- distinct visitor ids, so plain COUNTs are exact without a DISTINCT
                 web_network_control AS (
-                    SELECT COUNT(DISTINCT c.device_id) AS control_n,
-                        COUNT(DISTINCT CASE WHEN v.device_id IS NOT NULL THEN c.device_id END) AS control_visitors,
-                        COUNT(DISTINCT CASE WHEN v.device_id IS NOT NULL THEN c.device_id END)::FLOAT
-                            / NULLIF(COUNT(DISTINCT c.device_id), 0) * 100 AS control_rate
-                    FROM control_devices c LEFT JOIN adv_web_visit_days v ON v.device_id = c.device_id
+                    SELECT COUNT(*) AS control_n, COUNT(v.device_id) AS control_visitors,
+                        COUNT(v.device_id)::FLOAT / NULLIF(COUNT(*), 0) * 100 AS control_rate
+                    FROM control_devices c
+                    LEFT JOIN (SELECT DISTINCT device_id FROM adv_web_visit_days) v ON v.device_id = c.device_id
                 ),
                 store_network_control AS (
-                    SELECT COUNT(DISTINCT c.device_id) AS control_n,
-                        COUNT(DISTINCT CASE WHEN v.device_id IS NOT NULL THEN c.device_id END) AS control_visitors,
-                        COUNT(DISTINCT CASE WHEN v.device_id IS NOT NULL THEN c.device_id END)::FLOAT
-                            / NULLIF(COUNT(DISTINCT c.device_id), 0) * 100 AS control_rate
-                    FROM control_devices c LEFT JOIN adv_store_visit_days v ON v.device_id = c.device_id
+                    SELECT COUNT(*) AS control_n, COUNT(v.device_id) AS control_visitors,
+                        COUNT(v.device_id)::FLOAT / NULLIF(COUNT(*), 0) * 100 AS control_rate
+                    FROM control_devices c
+                    LEFT JOIN (SELECT DISTINCT device_id FROM adv_store_visit_days) v ON v.device_id = c.device_id
                 ),
                 exposed_store_visitors AS (
-                    SELECT COUNT(DISTINCT CASE WHEN sv.device_id IS NOT NULL THEN e.device_id END) AS store_visitors
-                    FROM exposed_devices e LEFT JOIN adv_store_visit_days sv ON sv.device_id = e.device_id
+                    SELECT COUNT(sv.device_id) AS store_visitors
+                    FROM exposed_devices e
+                    LEFT JOIN (SELECT DISTINCT device_id FROM adv_store_visit_days) sv ON sv.device_id = e.device_id
                 ),
                 campaign_metrics AS (
                     SELECT {group_cols}, {name_cols}
@@ -1002,17 +1507,13 @@ def get_lift_analysis():
                 'start_date': start_date, 'end_date': end_date
             })
 
-            columns = [desc[0] for desc in cursor.description]
             rows = cursor.fetchall()
             cursor.close()
-            conn.close()
+            release_snowflake_connection(conn)
 
             if not rows:
                 return jsonify({
-                    'success': True, 'web_data': [], 'store_data': [],
-                    'web_adv_baseline': None, 'web_network_baseline': None, 'store_network_baseline': None,
-                    'web_control_n': 0, 'store_control_n': 0,
-                    'total_web_visitors': 0, 'total_store_visitors': 0,
+                    'success': True, **_EMPTY_LIFT_PARAMOUNT,
                     'message': 'No lift data available - requires minimum 1,000 impressions per campaign'
                 })
 
@@ -1020,8 +1521,7 @@ def get_lift_analysis():
             web_adv_baseline = web_network_baseline = store_network_baseline = None
             web_control_n = store_control_n = total_web = total_store = 0
 
-            for row in rows:
-                d = dict(zip(columns, row))
+            for d in rows:
                 if total_web == 0:
                     total_web = int(d.get('TOTAL_WEB') or 0)
                     total_store = int(d.get('TOTAL_STORE') or 0)
@@ -1031,14 +1531,6 @@ def get_lift_analysis():
                     web_control_n = int(d.get('WEB_CONTROL_N') or 0)
                     store_control_n = int(d.get('STORE_CONTROL_N') or 0)
 
-                def confidence_from_z(z):
-                    if z is None: return None
-                    z = abs(float(z))
-                    if z >= 2.576: return '99%'
-                    if z >= 1.96: return '95%'
-                    if z >= 1.645: return '90%'
-                    return 'NS'
-
                 web_data.append({
                     'NAME': d['NAME'], 'PARENT_NAME': d.get('PARENT_NAME'),
                     'ID': d.get('ID'), 'PARENT_ID': d.get('PARENT_ID'),
@@ -1090,39 +1582,35 @@ def get_lift_analysis():
                 WITH campaign_metrics AS (
                     SELECT {group_cols}, {name_cols}
                         SUM(IMPRESSIONS) as IMPRESSIONS, SUM(REACH) as REACH,
-                        SUM(PANEL_REACH) as PANEL_REACH, SUM(VISITORS) as VISITORS
+                        SUM(PANEL_REACH) as PANEL_REACH, SUM(VISITORS) as VISITORS,
+                        -- Window runs after HAVING: the advertiser average over qualifying campaigns
+                        SUM(SUM(VISITORS)) OVER ()::FLOAT / NULLIF(SUM(SUM(PANEL_REACH)) OVER (), 0) * 100 as BASELINE_VR
                     FROM QUORUMDB.SEGMENT_DATA.CAMPAIGN_PERFORMANCE_REPORT_WEEKLY_STATS
                     WHERE ADVERTISER_ID = %(advertiser_id)s AND LOG_DATE BETWEEN %(start_date)s AND %(end_date)s
                     GROUP BY {group_cols} HAVING SUM(IMPRESSIONS) >= 1000
-                ),
-                baseline AS (
-                    SELECT SUM(VISITORS)::FLOAT / NULLIF(SUM(PANEL_REACH), 0) * 100 as BASELINE_VR
-                    FROM campaign_metrics
                 )
                 SELECT c.NAME, c.PARENT_NAME, c.ID, c.PARENT_ID, c.IMPRESSIONS, c.REACH, c.PANEL_REACH, c.VISITORS,
                     ROUND(c.VISITORS::FLOAT / NULLIF(c.PANEL_REACH, 0) * 100, 4) as VISIT_RATE,
-                    ROUND(b.BASELINE_VR, 4) as BASELINE_VR,
-                    CASE WHEN b.BASELINE_VR > 0 THEN ROUND(c.VISITORS::FLOAT / NULLIF(c.PANEL_REACH, 0) * 100 / b.BASELINE_VR * 100, 1) END as INDEX_VS_AVG,
-                    CASE WHEN b.BASELINE_VR > 0 THEN ROUND((c.VISITORS::FLOAT / NULLIF(c.PANEL_REACH, 0) * 100 - b.BASELINE_VR) / b.BASELINE_VR * 100, 1) END as LIFT_PCT
-                FROM campaign_metrics c CROSS JOIN baseline b
+                    ROUND(c.BASELINE_VR, 4) as BASELINE_VR,
+                    CASE WHEN c.BASELINE_VR > 0 THEN ROUND(c.VISITORS::FLOAT / NULLIF(c.PANEL_REACH, 0) * 100 / c.BASELINE_VR * 100, 1) END as INDEX_VS_AVG,
+                    CASE WHEN c.BASELINE_VR > 0 THEN ROUND((c.VISITORS::FLOAT / NULLIF(c.PANEL_REACH, 0) * 100 - c.BASELINE_VR) / c.BASELINE_VR * 100, 1) END as LIFT_PCT
+                FROM campaign_metrics c
                 WHERE c.PANEL_REACH >= 1000 ORDER BY c.IMPRESSIONS DESC LIMIT 100
             """
             cursor.execute(query, {'advertiser_id': int(advertiser_id), 'start_date': start_date, 'end_date': end_date})
             visit_type = 'store'
 
-        columns = [desc[0] for desc in cursor.description]
         rows = cursor.fetchall()
 
         if not rows:
             cursor.close()
-            conn.close()
+            release_snowflake_connection(conn)
             return jsonify({'success': True, 'data': [], 'baseline': None, 'visit_type': visit_type,
                 'message': 'No lift data available - requires minimum 1,000 panel reach per campaign'})
 
         baseline = None
         results = []
-        for row in rows:
-            d = dict(zip(columns, row))
+        for d in rows:
             if baseline is None and d.get('BASELINE_VR'):
                 baseline = float(d['BASELINE_VR'])
             for k, v in d.items():
@@ -1131,7 +1619,7 @@ def get_lift_analysis():
             results.append(d)
 
         cursor.close()
-        conn.close()
+        release_snowflake_connection(conn)
         return jsonify({'success': True, 'data': results, 'baseline': baseline, 'visit_type': visit_type})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -1148,14 +1636,15 @@ def get_traffic_sources():
 
     try:
         start_date, end_date = get_date_range()
+        empty = _empty_range_response(start_date, end_date, data=[])
+        if empty is not None:
+            return empty
 
         # Check cache first (this query scans 310M unclustered rows — ~15s cold)
         cache_key = f"traffic-sources:{advertiser_id}:{start_date}:{end_date}"
         cached = cache_get(cache_key)
         if cached is not None:
             return jsonify({'success': True, 'data': cached, 'cached': True})
-        conn = get_snowflake_connection()
-        cursor = conn.cursor()
 
         # IP-level (household) grouping for accurate pageviews per visitor.
         # WEB_VISITORS_TO_LOG has device-graph fan-out (~25 MAIDs per UUID),
@@ -1235,7 +1724,7 @@ def get_traffic_sources():
                 ROUND(AVG(pageviews), 2) AS AVG_PAGEVIEWS,
                 APPROX_PERCENTILE(pageviews, 0.50) AS P50_PAGES,
                 APPROX_PERCENTILE(pageviews, 0.90) AS P90_PAGES,
-                ROUND(SUM(CASE WHEN pageviews = 1 THEN 1 ELSE 0 END) * 100.0 / NULLIF(COUNT(*), 0), 1) AS BOUNCE_RATE,
+                ROUND(COUNT_IF(pageviews = 1) * 100.0 / NULLIF(COUNT(*), 0), 1) AS BOUNCE_RATE,
                 SUM(is_ctv) AS CTV_OVERLAP,
                 ROUND(SUM(is_ctv)::FLOAT / NULLIF(COUNT(*), 0) * 100, 1) AS CTV_OVERLAP_PCT,
                 ROUND(AVG(CASE WHEN is_ctv = 1 THEN pageviews END), 2) AS AVG_PAGES_CTV,
@@ -1249,24 +1738,22 @@ def get_traffic_sources():
                 ROUND(AVG(pageviews), 2) AS AVG_PAGEVIEWS,
                 APPROX_PERCENTILE(pageviews, 0.50) AS P50_PAGES,
                 APPROX_PERCENTILE(pageviews, 0.90) AS P90_PAGES,
-                ROUND(SUM(CASE WHEN pageviews = 1 THEN 1 ELSE 0 END) * 100.0 / NULLIF(COUNT(*), 0), 1) AS BOUNCE_RATE,
+                ROUND(COUNT_IF(pageviews = 1) * 100.0 / NULLIF(COUNT(*), 0), 1) AS BOUNCE_RATE,
                 0 AS CTV_OVERLAP, 0 AS CTV_OVERLAP_PCT,
                 NULL AS AVG_PAGES_CTV, NULL AS AVG_PAGES_NON_CTV
             FROM classified WHERE is_ctv = 1
             ORDER BY VISITOR_DAYS DESC
         """
 
-        cursor.execute(query, {
+        rows = run_query(query, {
             'advertiser_id': str(advertiser_id),
             'advertiser_id_int': int(advertiser_id),
             'start_date': start_date,
             'end_date': end_date
-        })
+        }, as_dicts=True)
 
-        columns = [desc[0] for desc in cursor.description]
         results = []
-        for row in cursor.fetchall():
-            d = dict(zip(columns, row))
+        for d in rows:
             for k, v in d.items():
                 if hasattr(v, 'is_integer'):
                     d[k] = int(v) if v == int(v) else float(v)
@@ -1274,9 +1761,6 @@ def get_traffic_sources():
                     d[k] = None
             results.append(d)
 
-        cursor.close()
-        conn.close()
-
         # Cache results for 10 min (310M row scan is expensive)
         cache_set(cache_key, results)
 
@@ -1288,33 +1772,32 @@ def get_traffic_sources():
 # AGENCY TIMESERIES (unchanged)
 # =============================================================================
 @app.route('/api/v5/agency-timeseries', methods=['GET'])
+@cached_response
 def get_agency_timeseries():
     try:
         start_date, end_date = get_date_range()
-        conn = get_snowflake_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT LOG_DATE::DATE as DT, AGENCY_ID, SUM(IMPRESSIONS) as IMPRESSIONS
-            FROM QUORUMDB.SEGMENT_DATA.CAMPAIGN_PERFORMANCE_REPORT_WEEKLY_STATS
-            WHERE LOG_DATE BETWEEN %(start_date)s AND %(end_date)s
-            GROUP BY LOG_DATE::DATE, AGENCY_ID HAVING SUM(IMPRESSIONS) > 0
-        """, {'start_date': start_date, 'end_date': end_date})
-        rows_b = cursor.fetchall()
+        empty = _empty_range_response(start_date, end_date, data={}, agencies={})
+        if empty is not None:
+            return empty
+        params = {'start_date': start_date, 'end_date': end_date}
+
+        with ThreadPoolExecutor(max_workers=2) as ex:
+            f_b = ex.submit(run_query, """
+                SELECT LOG_DATE::DATE as DT, AGENCY_ID, SUM(IMPRESSIONS) as IMPRESSIONS
+                FROM QUORUMDB.SEGMENT_DATA.CAMPAIGN_PERFORMANCE_REPORT_WEEKLY_STATS
+                WHERE LOG_DATE BETWEEN %(start_date)s AND %(end_date)s
+                GROUP BY LOG_DATE::DATE, AGENCY_ID HAVING SUM(IMPRESSIONS) > 0
+            """, params)
+            f_p = ex.submit(run_query, """
+                SELECT DATE::DATE as DT, 1480 as AGENCY_ID, SUM(IMPRESSIONS) as IMPRESSIONS
+                FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_DASHBOARD_SUMMARY_STATS
+                WHERE DATE BETWEEN %(start_date)s AND %(end_date)s
+                GROUP BY DATE::DATE HAVING SUM(IMPRESSIONS) > 0
+            """, params)
+            rows_b, rows_p_daily = f_b.result(), f_p.result()
 
         week_dates = sorted(set(str(r[0]) for r in rows_b))
 
-        cursor.execute("""
-            SELECT DATE::DATE as DT, 1480 as AGENCY_ID, SUM(IMPRESSIONS) as IMPRESSIONS
-            FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_DASHBOARD_SUMMARY_STATS
-            WHERE DATE BETWEEN %(start_date)s AND %(end_date)s
-            GROUP BY DATE::DATE HAVING SUM(IMPRESSIONS) > 0
-        """, {'start_date': start_date, 'end_date': end_date})
-        rows_p_daily = cursor.fetchall()
-
-        cursor.close()
-        conn.close()
-
         from datetime import datetime, timedelta
 
         def find_week_bucket(dt_str, anchors):
@@ -1368,6 +1851,7 @@ def get_agency_timeseries():
 # ADVERTISER TIMESERIES (unchanged)
 # =============================================================================
 @app.route('/api/v5/advertiser-timeseries', methods=['GET'])
+@cached_response
 def get_advertiser_timeseries():
     try:
         agency_id = request.args.get('agency_id')
@@ -1376,11 +1860,12 @@ def get_advertiser_timeseries():
 
         agency_id = int(agency_id)
         start_date, end_date = get_date_range()
-        conn = get_snowflake_connection()
-        cursor = conn.cursor()
+        empty = _empty_range_response(start_date, end_date, data={}, advertisers={})
+        if empty is not None:
+            return empty
 
         if agency_id == 1480:
-            cursor.execute("""
+            rows = run_query("""
                 WITH daily AS (
                     SELECT DATE::DATE as DT, QUORUM_ADVERTISER_ID as AID,
                            MAX(ADVERTISER_NAME) as ANAME, SUM(IMPRESSIONS) as IMPS
@@ -1389,10 +1874,9 @@ def get_advertiser_timeseries():
                     GROUP BY DATE::DATE, QUORUM_ADVERTISER_ID HAVING SUM(IMPRESSIONS) > 0
                 ),
                 ranked AS (
-                    SELECT AID, SUM(IMPS) as TOTAL_IMPS
+                    SELECT AID
                     FROM daily GROUP BY AID
-                    ORDER BY TOTAL_IMPS DESC
-                    LIMIT 15
+                    QUALIFY ROW_NUMBER() OVER (ORDER BY SUM(IMPS) DESC) <= 15
                 )
                 SELECT d.DT,
                        CASE WHEN r.AID IS NOT NULL THEN d.AID ELSE -1 END as ADVERTISER_ID,
@@ -1405,7 +1889,7 @@ def get_advertiser_timeseries():
                          CASE WHEN r.AID IS NOT NULL THEN d.ANAME ELSE 'Other' END
             """, {'start_date': start_date, 'end_date': end_date})
         else:
-            cursor.execute("""
+            rows = run_query("""
                 SELECT LOG_DATE::DATE as DT, w.ADVERTISER_ID,
                        COALESCE(MAX(aa.COMP_NAME), 'Advertiser ' || w.ADVERTISER_ID) as ADVERTISER_NAME,
                        SUM(w.IMPRESSIONS) as IMPRESSIONS
@@ -1415,10 +1899,6 @@ def get_advertiser_timeseries():
                 GROUP BY LOG_DATE::DATE, w.ADVERTISER_ID HAVING SUM(w.IMPRESSIONS) > 0
             """, {'agency_id': agency_id, 'start_date': start_date, 'end_date': end_date})
 
-        rows = cursor.fetchall()
-        cursor.close()
-        conn.close()
-
         data = {}
         advertisers = {}
         for dt, adv_id, adv_name, imps in rows:
@@ -1429,7 +1909,7 @@ def get_advertiser_timeseries():
             if adv_id not in advertisers:
                 name = adv_name or f'Advertiser {adv_id}'
                 if agency_id == 1480:
-                    name = re.sub(r'^[0-9A-Za-z]+ - ', '', name)
+                    name = strip_advertiser_prefix(name)
                 advertisers[adv_id] = name
 
         return jsonify({'success': True, 'data': data, 'advertisers': advertisers})
@@ -1439,7 +1919,154 @@ def get_advertiser_timeseries():
 # =============================================================================
 # OPTIMIZE RECOMMENDATIONS (unchanged — Paramount only)
 # =============================================================================
+def optimize_window():
+    """The 35-to-5-days-ago window as DATE binds. Snowflake never reuses results
+    for SQL that calls CURRENT_DATE, so the window is not computed in SQL."""
+    today = _default_dates(int(time.time() // 60))[1]
+    return {'window_start': today - timedelta(days=35), 'window_end': today - timedelta(days=5)}
+
+# Query text is constant (only the advertiser/agency/window binds vary), so build it
+# once at import rather than re-running the f-string assembly per request.
+def _build_optimize_queries(exact=False):
+    # --- PARAMOUNT PATH: row-level data with web + store visits ---
+    date_filter = "IMP_DATE BETWEEN %(window_start)s AND %(window_end)s"
+    adv_filter = "QUORUM_ADVERTISER_ID = %(adv_id)s"
+    imps_expr = distinct_count("CACHE_BUSTER", exact)
+    web_expr = distinct_count("CASE WHEN IS_SITE_VISIT = 'TRUE' THEN IP END", exact)
+    store_expr = distinct_count("CASE WHEN IS_STORE_VISIT = 'TRUE' THEN IMP_MAID END", exact)
+    web_vr = f"ROUND({web_expr}*100.0/NULLIF({imps_expr},0), 4)"
+    store_vr = f"ROUND({store_expr}*100.0/NULLIF({imps_expr},0), 4)"
+
+    q1_paramount = f"""
+        WITH base AS (
+            SELECT IO_ID, IO_NAME, LINEITEM_ID, LINEITEM_NAME, CREATIVE_NAME, SITE, IMP_DATE,
+                CACHE_BUSTER, IS_SITE_VISIT, IP, IS_STORE_VISIT, IMP_MAID
+            FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_IMPRESSIONS_REPORT_90_DAYS
+            WHERE {adv_filter} AND {date_filter}
+        )
+        SELECT 'baseline' as DIM_TYPE, 'overall' as DIM_KEY, NULL as DIM_NAME,
+            {imps_expr} as IMPS, {web_expr} as WEB_VISITS, {store_expr} as STORE_VISITS,
+            {web_vr} as WEB_VR, {store_vr} as STORE_VR
+        FROM base
+        UNION ALL
+        SELECT 'campaign', IO_ID::VARCHAR, MAX(IO_NAME), {imps_expr}, {web_expr}, {store_expr}, {web_vr}, {store_vr}
+        FROM base GROUP BY IO_ID
+        UNION ALL
+        SELECT 'lineitem', LINEITEM_ID::VARCHAR, MAX(LINEITEM_NAME), {imps_expr}, {web_expr}, {store_expr}, {web_vr}, {store_vr}
+        FROM base GROUP BY LINEITEM_ID
+        UNION ALL
+        SELECT 'creative', CREATIVE_NAME, NULL, {imps_expr}, {web_expr}, {store_expr}, {web_vr}, {store_vr}
+        FROM base GROUP BY CREATIVE_NAME
+        UNION ALL
+        SELECT 'dow', DAYOFWEEK(IMP_DATE)::VARCHAR, NULL, {imps_expr}, {web_expr}, {store_expr}, {web_vr}, {store_vr}
+        FROM base GROUP BY DAYOFWEEK(IMP_DATE)
+        UNION ALL
+        SELECT 'site', SITE, NULL, {imps_expr}, {web_expr}, {store_expr}, {web_vr}, {store_vr}
+        FROM base GROUP BY SITE HAVING {imps_expr} >= 500
+        ORDER BY 1, 4 DESC
+    """
+
+    # --- CLASS B PATH: weekly stats, store visits only (no web pixel) ---
+    vr_expr = "ROUND(SUM(VISITORS)*100.0/NULLIF(SUM(IMPRESSIONS),0), 4)"
+    q1_class_b = """
+        WITH base AS (
+            SELECT IO_ID, IO_NAME, LI_ID, LI_NAME, PUBLISHER, LOG_DATE, IMPRESSIONS, VISITORS
+            FROM QUORUMDB.SEGMENT_DATA.CAMPAIGN_PERFORMANCE_REPORT_WEEKLY_STATS
+            WHERE AGENCY_ID = %(agency_id)s AND ADVERTISER_ID = %(adv_id)s
+              AND LOG_DATE BETWEEN %(window_start)s AND %(window_end)s
+        )
+        SELECT 'baseline' as DIM_TYPE, 'overall' as DIM_KEY, NULL as DIM_NAME,
+            SUM(IMPRESSIONS) as IMPS, 0 as WEB_VISITS, SUM(VISITORS) as STORE_VISITS,
+            0 as WEB_VR, {vr} as STORE_VR
+        FROM base
+        UNION ALL
+        SELECT 'campaign', IO_ID::VARCHAR, MAX(IO_NAME),
+            SUM(IMPRESSIONS), 0, SUM(VISITORS), 0, {vr}
+        FROM base
+        GROUP BY IO_ID
+        UNION ALL
+        SELECT 'lineitem', LI_ID::VARCHAR, MAX(LI_NAME),
+            SUM(IMPRESSIONS), 0, SUM(VISITORS), 0, {vr}
+        FROM base
+        GROUP BY LI_ID
+        UNION ALL
+        SELECT 'site', PUBLISHER, NULL,
+            SUM(IMPRESSIONS), 0, SUM(VISITORS), 0, {vr}
+        FROM base
+        WHERE PUBLISHER IS NOT NULL AND PUBLISHER != ''
+        GROUP BY PUBLISHER HAVING SUM(IMPRESSIONS) >= 500
+        UNION ALL
+        SELECT 'dow', DAYOFWEEK(LOG_DATE)::VARCHAR, NULL,
+            SUM(IMPRESSIONS), 0, SUM(VISITORS), 0, {vr}
+        FROM base
+        GROUP BY DAYOFWEEK(LOG_DATE)
+        ORDER BY 1, 4 DESC
+    """.format(vr=vr_expr)
+    return q1_paramount, q1_class_b
+
+OPTIMIZE_PARAMOUNT_QUERY, OPTIMIZE_CLASS_B_QUERY = _build_optimize_queries()
+OPTIMIZE_PARAMOUNT_QUERY_EXACT, _ = _build_optimize_queries(exact=True)
+
+def _build_optimize_geo_queries(exact=False):
+    # --- PARAMOUNT PATH: row-level geo with web + store ---
+    date_filter = "IMP_DATE BETWEEN %(window_start)s AND %(window_end)s"
+    adv_filter = "QUORUM_ADVERTISER_ID = %(adv_id)s"
+    imps_expr = distinct_count("i.CACHE_BUSTER", exact)
+    web_expr = distinct_count("CASE WHEN i.IS_SITE_VISIT = 'TRUE' THEN i.IP END", exact)
+    store_expr = distinct_count("CASE WHEN i.IS_STORE_VISIT = 'TRUE' THEN i.IMP_MAID END", exact)
+    web_vr = f"ROUND({web_expr}*100.0/NULLIF({imps_expr},0), 4)"
+    store_vr = f"ROUND({store_expr}*100.0/NULLIF({imps_expr},0), 4)"
+
+    q2_paramount = f"""
+        WITH base AS (
+            SELECT ZIP_CODE, CACHE_BUSTER, IS_SITE_VISIT, IP, IS_STORE_VISIT, IMP_MAID
+            FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_IMPRESSIONS_REPORT_90_DAYS
+            WHERE {adv_filter} AND {date_filter}
+        )
+        SELECT 'dma' as DIM_TYPE, z.DMA_CODE as DIM_KEY, MAX(z.DMA_NAME) as DIM_NAME,
+            {imps_expr} as IMPS, {web_expr} as WEB_VISITS, {store_expr} as STORE_VISITS,
+            {web_vr} as WEB_VR, {store_vr} as STORE_VR
+        FROM base i
+        JOIN QUORUMDB.SEGMENT_DATA.ZIP_DMA_MAPPING z ON i.ZIP_CODE = z.ZIP_CODE
+        GROUP BY z.DMA_CODE HAVING {imps_expr} >= 500
+        UNION ALL
+        SELECT 'zip', i.ZIP_CODE, MAX(z.DMA_NAME), {imps_expr}, {web_expr}, {store_expr}, {web_vr}, {store_vr}
+        FROM base i
+        JOIN QUORUMDB.SEGMENT_DATA.ZIP_DMA_MAPPING z ON i.ZIP_CODE = z.ZIP_CODE
+        GROUP BY i.ZIP_CODE HAVING {imps_expr} >= 50
+        ORDER BY 1, 4 DESC
+    """
+
+    # --- CLASS B PATH: weekly stats geo, store visits only ---
+    vr_expr = "ROUND(SUM(VISITORS)*100.0/NULLIF(SUM(IMPRESSIONS),0), 4)"
+    q2_class_b = """
+        WITH base AS (
+            SELECT DMA, ZIP, IMPRESSIONS, VISITORS
+            FROM QUORUMDB.SEGMENT_DATA.CAMPAIGN_PERFORMANCE_REPORT_WEEKLY_STATS
+            WHERE AGENCY_ID = %(agency_id)s AND ADVERTISER_ID = %(adv_id)s
+              AND LOG_DATE BETWEEN %(window_start)s AND %(window_end)s
+        )
+        SELECT 'dma' as DIM_TYPE, DMA as DIM_KEY, DMA as DIM_NAME,
+            SUM(IMPRESSIONS) as IMPS, 0 as WEB_VISITS, SUM(VISITORS) as STORE_VISITS,
+            0 as WEB_VR, {vr} as STORE_VR
+        FROM base
+        WHERE DMA IS NOT NULL AND DMA != ''
+        GROUP BY DMA HAVING SUM(IMPRESSIONS) >= 500
+        UNION ALL
+        SELECT 'zip', ZIP, MAX(DMA),
+            SUM(IMPRESSIONS), 0, SUM(VISITORS), 0, {vr}
+        FROM base
+        WHERE ZIP IS NOT NULL AND ZIP != ''
+        GROUP BY ZIP HAVING SUM(IMPRESSIONS) >= 50
+        ORDER BY 1, 4 DESC
+    """.format(vr=vr_expr)
+    return q2_paramount, q2_class_b
+
+OPTIMIZE_GEO_PARAMOUNT_QUERY, OPTIMIZE_GEO_CLASS_B_QUERY = _build_optimize_geo_queries()
+OPTIMIZE_GEO_PARAMOUNT_QUERY_EXACT, _ = _build_optimize_geo_queries(exact=True)
+
 @app.route('/api/v5/optimize', methods=['GET'])
+@cached_response
 def get_optimize():
     advertiser_id = request.args.get('advertiser_id')
     agency_id = request.args.get('agency_id')
@@ -1448,109 +2075,30 @@ def get_optimize():
         return jsonify({'success': False, 'error': 'advertiser_id parameter required'}), 400
 
     try:
-        conn = get_snowflake_connection()
-        cursor = conn.cursor()
 
         is_paramount = agency_id and int(agency_id) == 1480
 
         if is_paramount:
             # --- PARAMOUNT PATH: row-level data with web + store visits ---
-            date_filter = "IMP_DATE BETWEEN DATEADD(day, -35, CURRENT_DATE) AND DATEADD(day, -5, CURRENT_DATE)"
-            adv_filter = "QUORUM_ADVERTISER_ID = %(adv_id)s"
-            imps_expr = "COUNT(DISTINCT CACHE_BUSTER)"
-            web_expr = "COUNT(DISTINCT CASE WHEN IS_SITE_VISIT = 'TRUE' THEN IP END)"
-            store_expr = "COUNT(DISTINCT CASE WHEN IS_STORE_VISIT = 'TRUE' THEN IMP_MAID END)"
-            web_vr = f"ROUND({web_expr}*100.0/NULLIF({imps_expr},0), 4)"
-            store_vr = f"ROUND({store_expr}*100.0/NULLIF({imps_expr},0), 4)"
-
-            q1 = f"""
-                SELECT 'baseline' as DIM_TYPE, 'overall' as DIM_KEY, NULL as DIM_NAME,
-                    {imps_expr} as IMPS, {web_expr} as WEB_VISITS, {store_expr} as STORE_VISITS,
-                    {web_vr} as WEB_VR, {store_vr} as STORE_VR
-                FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_IMPRESSIONS_REPORT_90_DAYS
-                WHERE {adv_filter} AND {date_filter}
-                UNION ALL
-                SELECT 'campaign', IO_ID::VARCHAR, MAX(IO_NAME), {imps_expr}, {web_expr}, {store_expr}, {web_vr}, {store_vr}
-                FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_IMPRESSIONS_REPORT_90_DAYS
-                WHERE {adv_filter} AND {date_filter} GROUP BY IO_ID
-                UNION ALL
-                SELECT 'lineitem', LINEITEM_ID::VARCHAR, MAX(LINEITEM_NAME), {imps_expr}, {web_expr}, {store_expr}, {web_vr}, {store_vr}
-                FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_IMPRESSIONS_REPORT_90_DAYS
-                WHERE {adv_filter} AND {date_filter} GROUP BY LINEITEM_ID
-                UNION ALL
-                SELECT 'creative', CREATIVE_NAME, NULL, {imps_expr}, {web_expr}, {store_expr}, {web_vr}, {store_vr}
-                FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_IMPRESSIONS_REPORT_90_DAYS
-                WHERE {adv_filter} AND {date_filter} GROUP BY CREATIVE_NAME
-                UNION ALL
-                SELECT 'dow', DAYOFWEEK(IMP_DATE)::VARCHAR, NULL, {imps_expr}, {web_expr}, {store_expr}, {web_vr}, {store_vr}
-                FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_IMPRESSIONS_REPORT_90_DAYS
-                WHERE {adv_filter} AND {date_filter} GROUP BY DAYOFWEEK(IMP_DATE)
-                UNION ALL
-                SELECT 'site', SITE, NULL, {imps_expr}, {web_expr}, {store_expr}, {web_vr}, {store_vr}
-                FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_IMPRESSIONS_REPORT_90_DAYS
-                WHERE {adv_filter} AND {date_filter} GROUP BY SITE HAVING COUNT(DISTINCT CACHE_BUSTER) >= 500
-                ORDER BY 1, 4 DESC
-            """
-            cursor.execute(q1, {'adv_id': int(advertiser_id)})
+            query = OPTIMIZE_PARAMOUNT_QUERY_EXACT if wants_exact() else OPTIMIZE_PARAMOUNT_QUERY
+            rows = run_query(query, {'adv_id': int(advertiser_id), **optimize_window()}, as_dicts=True)
         else:
             # --- CLASS B PATH: weekly stats, store visits only (no web pixel) ---
-            vr_expr = "ROUND(SUM(VISITORS)*100.0/NULLIF(SUM(IMPRESSIONS),0), 4)"
-            q1 = """
-                SELECT 'baseline' as DIM_TYPE, 'overall' as DIM_KEY, NULL as DIM_NAME,
-                    SUM(IMPRESSIONS) as IMPS, 0 as WEB_VISITS, SUM(VISITORS) as STORE_VISITS,
-                    0 as WEB_VR, {vr} as STORE_VR
-                FROM QUORUMDB.SEGMENT_DATA.CAMPAIGN_PERFORMANCE_REPORT_WEEKLY_STATS
-                WHERE AGENCY_ID = %(agency_id)s AND ADVERTISER_ID = %(adv_id)s
-                  AND LOG_DATE BETWEEN DATEADD(day, -35, CURRENT_DATE) AND DATEADD(day, -5, CURRENT_DATE)
-                UNION ALL
-                SELECT 'campaign', IO_ID::VARCHAR, MAX(IO_NAME),
-                    SUM(IMPRESSIONS), 0, SUM(VISITORS), 0, {vr}
-                FROM QUORUMDB.SEGMENT_DATA.CAMPAIGN_PERFORMANCE_REPORT_WEEKLY_STATS
-                WHERE AGENCY_ID = %(agency_id)s AND ADVERTISER_ID = %(adv_id)s
-                  AND LOG_DATE BETWEEN DATEADD(day, -35, CURRENT_DATE) AND DATEADD(day, -5, CURRENT_DATE)
-                GROUP BY IO_ID
-                UNION ALL
-                SELECT 'lineitem', LI_ID::VARCHAR, MAX(LI_NAME),
-                    SUM(IMPRESSIONS), 0, SUM(VISITORS), 0, {vr}
-                FROM QUORUMDB.SEGMENT_DATA.CAMPAIGN_PERFORMANCE_REPORT_WEEKLY_STATS
-                WHERE AGENCY_ID = %(agency_id)s AND ADVERTISER_ID = %(adv_id)s
-                  AND LOG_DATE BETWEEN DATEADD(day, -35, CURRENT_DATE) AND DATEADD(day, -5, CURRENT_DATE)
-                GROUP BY LI_ID
-                UNION ALL
-                SELECT 'site', PUBLISHER, NULL,
-                    SUM(IMPRESSIONS), 0, SUM(VISITORS), 0, {vr}
-                FROM QUORUMDB.SEGMENT_DATA.CAMPAIGN_PERFORMANCE_REPORT_WEEKLY_STATS
-                WHERE AGENCY_ID = %(agency_id)s AND ADVERTISER_ID = %(adv_id)s
-                  AND LOG_DATE BETWEEN DATEADD(day, -35, CURRENT_DATE) AND DATEADD(day, -5, CURRENT_DATE)
-                  AND PUBLISHER IS NOT NULL AND PUBLISHER != ''
-                GROUP BY PUBLISHER HAVING SUM(IMPRESSIONS) >= 500
-                UNION ALL
-                SELECT 'dow', DAYOFWEEK(LOG_DATE)::VARCHAR, NULL,
-                    SUM(IMPRESSIONS), 0, SUM(VISITORS), 0, {vr}
-                FROM QUORUMDB.SEGMENT_DATA.CAMPAIGN_PERFORMANCE_REPORT_WEEKLY_STATS
-                WHERE AGENCY_ID = %(agency_id)s AND ADVERTISER_ID = %(adv_id)s
-                  AND LOG_DATE BETWEEN DATEADD(day, -35, CURRENT_DATE) AND DATEADD(day, -5, CURRENT_DATE)
-                GROUP BY DAYOFWEEK(LOG_DATE)
-                ORDER BY 1, 4 DESC
-            """.format(vr=vr_expr)
-            cursor.execute(q1, {'agency_id': int(agency_id), 'adv_id': int(advertiser_id)})
-
-        columns = [desc[0] for desc in cursor.description]
+            rows = run_query(OPTIMIZE_CLASS_B_QUERY, {'agency_id': int(agency_id), 'adv_id': int(advertiser_id), **optimize_window()}, as_dicts=True)
+
         results = []
-        for row in cursor.fetchall():
-            d = dict(zip(columns, row))
+        for d in rows:
             for k, v in d.items():
                 if hasattr(v, 'is_integer'):
                     d[k] = float(v) if v else 0
             results.append(d)
 
-        cursor.close()
-        conn.close()
         return jsonify({'success': True, 'data': results})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/v5/optimize-geo', methods=['GET'])
+@cached_response
 def get_optimize_geo():
     advertiser_id = request.args.get('advertiser_id')
     agency_id = request.args.get('agency_id')
@@ -1559,73 +2107,24 @@ def get_optimize_geo():
         return jsonify({'success': False, 'error': 'advertiser_id parameter required'}), 400
 
     try:
-        conn = get_snowflake_connection()
-        cursor = conn.cursor()
 
         is_paramount = agency_id and int(agency_id) == 1480
 
         if is_paramount:
             # --- PARAMOUNT PATH: row-level geo with web + store ---
-            date_filter = "IMP_DATE BETWEEN DATEADD(day, -35, CURRENT_DATE) AND DATEADD(day, -5, CURRENT_DATE)"
-            adv_filter = "QUORUM_ADVERTISER_ID = %(adv_id)s"
-            imps_expr = "COUNT(DISTINCT i.CACHE_BUSTER)"
-            web_expr = "COUNT(DISTINCT CASE WHEN i.IS_SITE_VISIT = 'TRUE' THEN i.IP END)"
-            store_expr = "COUNT(DISTINCT CASE WHEN i.IS_STORE_VISIT = 'TRUE' THEN i.IMP_MAID END)"
-            web_vr = f"ROUND({web_expr}*100.0/NULLIF({imps_expr},0), 4)"
-            store_vr = f"ROUND({store_expr}*100.0/NULLIF({imps_expr},0), 4)"
-
-            q2 = f"""
-                SELECT 'dma' as DIM_TYPE, z.DMA_CODE as DIM_KEY, MAX(z.DMA_NAME) as DIM_NAME,
-                    {imps_expr} as IMPS, {web_expr} as WEB_VISITS, {store_expr} as STORE_VISITS,
-                    {web_vr} as WEB_VR, {store_vr} as STORE_VR
-                FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_IMPRESSIONS_REPORT_90_DAYS i
-                JOIN QUORUMDB.SEGMENT_DATA.ZIP_DMA_MAPPING z ON i.ZIP_CODE = z.ZIP_CODE
-                WHERE i.{adv_filter} AND i.{date_filter}
-                GROUP BY z.DMA_CODE HAVING COUNT(DISTINCT i.CACHE_BUSTER) >= 500
-                UNION ALL
-                SELECT 'zip', i.ZIP_CODE, MAX(z.DMA_NAME), {imps_expr}, {web_expr}, {store_expr}, {web_vr}, {store_vr}
-                FROM QUORUMDB.SEGMENT_DATA.PARAMOUNT_IMPRESSIONS_REPORT_90_DAYS i
-                JOIN QUORUMDB.SEGMENT_DATA.ZIP_DMA_MAPPING z ON i.ZIP_CODE = z.ZIP_CODE
-                WHERE i.{adv_filter} AND i.{date_filter}
-                GROUP BY i.ZIP_CODE HAVING COUNT(DISTINCT i.CACHE_BUSTER) >= 50
-                ORDER BY 1, 4 DESC
-            """
-            cursor.execute(q2, {'adv_id': int(advertiser_id)})
+            query = OPTIMIZE_GEO_PARAMOUNT_QUERY_EXACT if wants_exact() else OPTIMIZE_GEO_PARAMOUNT_QUERY
+            rows = run_query(query, {'adv_id': int(advertiser_id), **optimize_window()}, as_dicts=True)
         else:
             # --- CLASS B PATH: weekly stats geo, store visits only ---
-            vr_expr = "ROUND(SUM(VISITORS)*100.0/NULLIF(SUM(IMPRESSIONS),0), 4)"
-            q2 = """
-                SELECT 'dma' as DIM_TYPE, DMA as DIM_KEY, DMA as DIM_NAME,
-                    SUM(IMPRESSIONS) as IMPS, 0 as WEB_VISITS, SUM(VISITORS) as STORE_VISITS,
-                    0 as WEB_VR, {vr} as STORE_VR
-                FROM QUORUMDB.SEGMENT_DATA.CAMPAIGN_PERFORMANCE_REPORT_WEEKLY_STATS
-                WHERE AGENCY_ID = %(agency_id)s AND ADVERTISER_ID = %(adv_id)s
-                  AND LOG_DATE BETWEEN DATEADD(day, -35, CURRENT_DATE) AND DATEADD(day, -5, CURRENT_DATE)
-                  AND DMA IS NOT NULL AND DMA != ''
-                GROUP BY DMA HAVING SUM(IMPRESSIONS) >= 500
-                UNION ALL
-                SELECT 'zip', ZIP, MAX(DMA),
-                    SUM(IMPRESSIONS), 0, SUM(VISITORS), 0, {vr}
-                FROM QUORUMDB.SEGMENT_DATA.CAMPAIGN_PERFORMANCE_REPORT_WEEKLY_STATS
-                WHERE AGENCY_ID = %(agency_id)s AND ADVERTISER_ID = %(adv_id)s
-                  AND LOG_DATE BETWEEN DATEADD(day, -35, CURRENT_DATE) AND DATEADD(day, -5, CURRENT_DATE)
-                  AND ZIP IS NOT NULL AND ZIP != ''
-                GROUP BY ZIP HAVING SUM(IMPRESSIONS) >= 50
-                ORDER BY 1, 4 DESC
-            """.format(vr=vr_expr)
-            cursor.execute(q2, {'agency_id': int(agency_id), 'adv_id': int(advertiser_id)})
-
-        columns = [desc[0] for desc in cursor.description]
+            rows = run_query(OPTIMIZE_GEO_CLASS_B_QUERY, {'agency_id': int(agency_id), 'adv_id': int(advertiser_id), **optimize_window()}, as_dicts=True)
+
         results = []
-        for row in cursor.fetchall():
-            d = dict(zip(columns, row))
+        for d in rows:
             for k, v in d.items():
                 if hasattr(v, 'is_integer'):
                     d[k] = float(v) if v else 0
             results.append(d)
 
-        cursor.close()
-        conn.close()
         return jsonify({'success': True, 'data': results})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -1641,20 +2140,23 @@ def pipeline_health():
         cursor = conn.cursor()
 
         # =====================================================================
-        # 1. TABLE METADATA — batch SHOW TABLES (metadata only, instant)
+        # 1. TABLE METADATA — one SHOW TABLES for both schemas (metadata only,
+        #    instant; lists only tables the role can see, so no per-schema try)
         # =====================================================================
         table_meta = {}
-        for schema in ['BASE_TABLES', 'DERIVED_TABLES']:
-            try:
-                cursor.execute(f"SHOW TABLES IN SCHEMA QUORUMDB.{schema}")
-                for row in cursor.fetchall():
-                    full_name = f"QUORUMDB.{schema}.{row[1]}"
-                    table_meta[full_name] = {
-                        'rows': int(row[7]) if row[7] else 0,
-                        'bytes': int(row[8]) if row[8] else 0
-                    }
-            except:
-                pass
+        try:
+            cursor.execute("SHOW TABLES IN DATABASE QUORUMDB")
+            for row in cursor:
+                schema = row[3]
+                if schema not in ('BASE_TABLES', 'DERIVED_TABLES'):
+                    continue
+                full_name = f"QUORUMDB.{schema}.{row[1]}"
+                table_meta[full_name] = {
+                    'rows': int(row[7]) if row[7] else 0,
+                    'bytes': int(row[8]) if row[8] else 0
+                }
+        except:
+            pass
 
         # =====================================================================
         # 2. FRESHNESS — MAX only (no COUNT, uses micropartition metadata)
@@ -1671,15 +2173,20 @@ def pipeline_health():
             ('web_pixel_events', "SELECT MAX(STAGING_SYS_TIMESTAMP)::DATE FROM QUORUMDB.DERIVED_TABLES.WEBPIXEL_EVENTS WHERE STAGING_SYS_TIMESTAMP >= DATEADD('day', -30, CURRENT_DATE())"),
         ]
 
-        for pname, query in freshness_queries:
+        def freshness(query):
             try:
-                cursor.execute(query)
-                row = cursor.fetchone()
-                last_data_str = str(row[0]) if row and row[0] else None
+                rows = run_query(query)
+                last_data_str = str(rows[0][0]) if rows and rows[0][0] else None
                 ds = (date.today() - datetime.strptime(last_data_str, '%Y-%m-%d').date()).days if last_data_str else 999
-                volume_trends[pname] = {'last_data': last_data_str, 'days_stale': ds}
+                return {'last_data': last_data_str, 'days_stale': ds}
             except:
-                volume_trends[pname] = {'last_data': None, 'days_stale': 999}
+                return {'last_data': None, 'days_stale': 999}
+
+        # Independent single-row lookups on different tables — run them side by side
+        with ThreadPoolExecutor(max_workers=len(freshness_queries)) as ex:
+            results = ex.map(freshness, [query for _, query in freshness_queries])
+            for (pname, _), vt in zip(freshness_queries, results):
+                volume_trends[pname] = vt
 
         # Build table_health from freshness + metadata (zero data scanning)
         pipeline_config = [
@@ -1725,7 +2232,7 @@ def pipeline_health():
         tasks = []
         try:
             cursor.execute("SHOW TASKS IN DATABASE QUORUMDB")
-            for row in cursor.fetchall():
+            for row in cursor:
                 task_name = row[1]
                 schema = row[4]
                 schedule = row[8]
@@ -1770,7 +2277,7 @@ def pipeline_health():
                 ORDER BY STARTED_AT DESC
                 LIMIT 20
             """)
-            for row in cursor.fetchall():
+            for row in cursor:
                 transform_log.append({
                     'BATCH_ID': row[0], 'STATUS': row[1],
                     'STARTED_AT': str(row[2]) if row[2] else None,
@@ -1789,7 +2296,7 @@ def pipeline_health():
         procedures = []
         try:
             cursor.execute("SHOW USER PROCEDURES IN DATABASE QUORUMDB")
-            for row in cursor.fetchall():
+            for row in cursor:
                 proc_name = row[1]
                 schema = row[2]
                 desc = row[9] if len(row) > 9 else ''
@@ -1806,7 +2313,7 @@ def pipeline_health():
         # Table access tracking is loaded async via /api/v5/table-access
 
         cursor.close()
-        conn.close()
+        release_snowflake_connection(conn)
 
         # =====================================================================
         # 8. BUILD RESPONSE
@@ -1859,9 +2366,6 @@ def pipeline_health():
 def get_table_access():
     """Table access tracking: who's querying what, anomaly detection."""
     try:
-        conn = get_snowflake_connection()
-        cursor = conn.cursor()
-
         tracked = [
             ('AD_IMPRESSION_LOG_V2', 'Ad Impressions'),
             ('STORE_VISITS', 'Store Visits'),
@@ -1875,10 +2379,10 @@ def get_table_access():
             ('LIVERAMP_IMPRESSION_LOG', 'LiveRamp Impressions'),
         ]
         case_cols = ",\n".join(
-            f"SUM(CASE WHEN UPPER(QUERY_TEXT) LIKE '%{t[0]}%' THEN 1 ELSE 0 END) AS \"{t[0]}\""
+            f"COUNT_IF(UPPER(QUERY_TEXT) LIKE '%{t[0]}%') AS \"{t[0]}\""
             for t in tracked
         )
-        cursor.execute(f"""
+        daily_rows = run_query(f"""
             SELECT
                 START_TIME::DATE as query_date,
                 COUNT(DISTINCT USER_NAME) as daily_users,
@@ -1889,9 +2393,7 @@ def get_table_access():
               AND QUERY_TYPE IN ('SELECT','INSERT','CREATE_TABLE_AS_SELECT','MERGE')
             GROUP BY query_date
             ORDER BY query_date
-        """)
-        columns = [desc[0] for desc in cursor.description]
-        daily_rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        """, as_dicts=True)
 
         today_str = str(date.today())
         yesterday_str = str(date.today() - timedelta(days=1))
@@ -1939,8 +2441,6 @@ def get_table_access():
 
         table_access.sort(key=lambda x: x['total_queries_7d'], reverse=True)
 
-        cursor.close()
-        conn.close()
         return jsonify({'success': True, 'data': table_access, 'alerts': access_alerts})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)[:200],
@@ -1949,6 +2449,11 @@ def get_table_access():
 # =============================================================================
 # MAIN
 # =============================================================================
+# Local development only. This v5 module is not what the Procfile serves: that
+# runs server:app, which imports optimizer_api_v6. To run v5 as a standalone
+# service, use gunicorn with the Procfile's flags so threaded workers share the
+# Snowflake connection pool:
+#   gunicorn app:app --bind 0.0.0.0:$PORT --timeout 120 --workers 2 --worker-class gthread --threads 8 --keep-alive 75
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 8080))
-    app.run(host='0.0.0.0', port=port, debug=False)
+    app.run(host='0.0.0.0', port=port, debug=False, threaded=True)